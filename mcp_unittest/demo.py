@@ -2,21 +2,27 @@
 """
 Demo script for MCP Unit Test Generator Server
 """
+import asyncio
 import json
 import os
 import sys
 import time
 from pathlib import Path
 
-import requests
+import httpx
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-def test_server_health():
+BASE_URL = 'http://localhost:5000'
+
+# Connection pool shared by every demo request (keep-alive)
+CLIENT_LIMITS = httpx.Limits(max_keepalive_connections=4, max_connections=8)
+
+async def test_server_health(client):
     """Test if server is running"""
     try:
-        response = requests.get('http://localhost:5000/health', timeout=5)
+        response = await client.get('/health', timeout=5)
         if response.status_code == 200:
             print("✅ Server is running")
             print(f"Response: {response.json()}")
@@ -24,11 +30,11 @@ def test_server_health():
         else:
             print(f"❌ Server returned status {response.status_code}")
             return False
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ Server is not running: {e}")
         return False
 
-def test_code_analysis():
+async def test_code_analysis(client):
     """Test code analysis functionality"""
     print("\n🔍 Testing Code Analysis...")
     
@@ -44,8 +50,7 @@ def test_code_analysis():
     }
     
     try:
-        response = requests.post('http://localhost:5000/analyze', 
-                               json=data, timeout=30)
+        response = await client.post('/analyze', json=data, timeout=30)
         
         if response.status_code == 200:
             result = response.json()
@@ -59,11 +64,11 @@ def test_code_analysis():
             print(f"   Error: {response.text}")
             return None
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ Request failed: {e}")
         return None
 
-def test_test_generation(analysis_result):
+async def test_test_generation(client, analysis_result):
     """Test test generation functionality"""
     print("\n🧪 Testing Test Generation...")
     
@@ -77,41 +82,52 @@ def test_test_generation(analysis_result):
         'coverage_target': 80
     }
     
+    output_dir = Path('generated_tests')
+    output_dir.mkdir(exist_ok=True)
+    writes = []
+    result = None
+    
     try:
-        response = requests.post('http://localhost:5000/generate', 
-                               json=data, timeout=60)
+        # Tests arrive one by one; each is written to disk while the rest are still generating
+        async with client.stream('POST', '/generate/stream', json=data, timeout=60) as response:
+            if response.status_code != 200:
+                await response.aread()
+                print(f"❌ Test generation failed: {response.status_code}")
+                print(f"   Error: {response.text}")
+                return None
+            
+            event = None
+            async for line in response.aiter_lines():
+                if line.startswith('event: '):
+                    event = line[len('event: '):]
+                elif line.startswith('data: '):
+                    payload = json.loads(line[len('data: '):])
+                    if event == 'test':
+                        test_file = output_dir / payload['file_name']
+                        writes.append((test_file, asyncio.create_task(
+                            asyncio.to_thread(test_file.write_text, payload['test_code'])
+                        )))
+                    elif event == 'done':
+                        result = payload
+                    elif event == 'error':
+                        print(f"❌ Test generation failed: {payload.get('error')}")
         
-        if response.status_code == 200:
-            result = response.json()
+        for test_file, write in writes:
+            await write
+            print(f"   - Saved: {test_file}")
+        
+        if result:
             print("✅ Test generation successful")
             print(f"   - Tests generated: {result.get('total_tests', 0)}")
             print(f"   - Test framework: {result.get('test_framework', 'unknown')}")
-            
-            # Save generated tests to files
-            for test in result.get('generated_tests', []):
-                test_file = Path('generated_tests') / test['file_name']
-                test_file.parent.mkdir(exist_ok=True)
-                
-                with open(test_file, 'w') as f:
-                    f.write(test['test_code'])
-                
-                print(f"   - Saved: {test_file}")
-            
-            return result
-        else:
-            print(f"❌ Test generation failed: {response.status_code}")
-            print(f"   Error: {response.text}")
-            return None
+        return result
     
-    except requests.exceptions.RequestException as e:
+    except (httpx.HTTPError, OSError) as e:
         print(f"❌ Request failed: {e}")
         return None
 
-def test_mcp_protocol():
-    """Test MCP protocol endpoints"""
-    print("\n🔌 Testing MCP Protocol...")
-    
-    # Test initialize
+async def test_mcp_initialize(client):
+    """Test the MCP initialize request"""
     init_request = {
         "method": "initialize",
         "params": {
@@ -122,8 +138,7 @@ def test_mcp_protocol():
     }
     
     try:
-        response = requests.post('http://localhost:5000/mcp', 
-                               json=init_request, timeout=10)
+        response = await client.post('/mcp', json=init_request, timeout=10)
         
         if response.status_code == 200:
             result = response.json()
@@ -132,18 +147,18 @@ def test_mcp_protocol():
         else:
             print(f"❌ MCP Initialize failed: {response.status_code}")
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ MCP Initialize request failed: {e}")
-    
-    # Test tools list
+
+async def test_mcp_tools_list(client):
+    """Test the MCP tools/list request"""
     tools_request = {
         "method": "tools/list",
         "id": "2"
     }
     
     try:
-        response = requests.post('http://localhost:5000/mcp', 
-                               json=tools_request, timeout=10)
+        response = await client.post('/mcp', json=tools_request, timeout=10)
         
         if response.status_code == 200:
             result = response.json()
@@ -155,33 +170,37 @@ def test_mcp_protocol():
         else:
             print(f"❌ MCP Tools list failed: {response.status_code}")
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ MCP Tools list request failed: {e}")
 
-def main():
+async def main():
     """Run demo"""
     print("🚀 MCP Unit Test Generator Server Demo")
     print("=" * 50)
     
-    # Test server health
-    if not test_server_health():
-        print("\n💡 To start the server, run:")
-        print("   cd mcp_unittest_server")
-        print("   source venv/bin/activate")
-        print("   python src/main.py")
-        return
-    
-    # Test MCP protocol
-    test_mcp_protocol()
-    
-    # Test code analysis
-    analysis_result = test_code_analysis()
-    
-    # Test test generation
-    if analysis_result:
-        test_test_generation(analysis_result)
+    async with httpx.AsyncClient(base_url=BASE_URL, limits=CLIENT_LIMITS) as client:
+        # The health check and MCP protocol probes are independent, so run them together
+        print("\n🔌 Testing MCP Protocol...")
+        healthy, _, _ = await asyncio.gather(
+            test_server_health(client),
+            test_mcp_initialize(client),
+            test_mcp_tools_list(client)
+        )
+        
+        if not healthy:
+            print("\n💡 To start the server, run:")
+            print("   cd mcp_unittest_server")
+            print("   source venv/bin/activate")
+            print("   python src/main.py")
+            return
+        
+        # Test code analysis
+        analysis_result = await test_code_analysis(client)
+        
+        # Test test generation
+        if analysis_result:
+            await test_test_generation(client, analysis_result)
     
 
 if __name__ == '__main__':
-    main()
-
+    asyncio.run(main())
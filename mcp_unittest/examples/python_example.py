@@ -1,29 +1,32 @@
 """
 Example Python module for testing the MCP Unit Test Generator
 """
+import functools
+import math
 
 class Calculator:
     """A simple calculator class for demonstration"""
     
     def __init__(self):
+        # Raw (operator, a, b, result) records, formatted in get_history
         self.history = []
     
     def add(self, a: float, b: float) -> float:
         """Add two numbers"""
         result = a + b
-        self.history.append(f"{a} + {b} = {result}")
+        self.history.append(('+', a, b, result))
         return result
     
     def subtract(self, a: float, b: float) -> float:
         """Subtract b from a"""
         result = a - b
-        self.history.append(f"{a} - {b} = {result}")
+        self.history.append(('-', a, b, result))
         return result
     
     def multiply(self, a: float, b: float) -> float:
         """Multiply two numbers"""
         result = a * b
-        self.history.append(f"{a} * {b} = {result}")
+        self.history.append(('*', a, b, result))
         return result
     
     def divide(self, a: float, b: float) -> float:
@@ -31,18 +34,18 @@ class Calculator:
         if b == 0:
             raise ValueError("Cannot divide by zero")
         result = a / b
-        self.history.append(f"{a} / {b} = {result}")
+        self.history.append(('/', a, b, result))
         return result
     
     def power(self, base: float, exponent: float) -> float:
         """Calculate base raised to the power of exponent"""
         result = base ** exponent
-        self.history.append(f"{base} ^ {exponent} = {result}")
+        self.history.append(('^', base, exponent, result))
         return result
     
     def get_history(self) -> list:
         """Get calculation history"""
-        return self.history.copy()
+        return [f"{a} {op} {b} = {result}" for op, a, b, result in self.history]
     
     def clear_history(self):
         """Clear calculation history"""
@@ -52,9 +55,7 @@ def factorial(n: int) -> int:
     """Calculate factorial of n"""
     if n < 0:
         raise ValueError("Factorial is not defined for negative numbers")
-    if n == 0 or n == 1:
-        return 1
-    return n * factorial(n - 1)
+    return math.factorial(n)
 
 def fibonacci(n: int) -> int:
     """Calculate nth Fibonacci number"""
@@ -64,19 +65,27 @@ def fibonacci(n: int) -> int:
         return 0
     if n == 1:
         return 1
-    return fibonacci(n - 1) + fibonacci(n - 2)
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
 
+@functools.lru_cache(maxsize=4096)
 def is_prime(n: int) -> bool:
     """Check if a number is prime"""
     if n < 2:
         return False
-    if n == 2:
+    if n in (2, 3):
         return True
-    if n % 2 == 0:
+    if n % 2 == 0 or n % 3 == 0:
         return False
     
-    for i in range(3, int(n ** 0.5) + 1, 2):
-        if n % i == 0:
+    # Every prime above 3 has the form 6k - 1 or 6k + 1
+    i = 5
+    limit = math.isqrt(n)
+    while i <= limit:
+        if n % i == 0 or n % (i + 2) == 0:
             return False
+        i += 6
     return True
 
@@ -6,6 +6,7 @@ import subprocess
 import json
 import tempfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 import logging
@@ -205,38 +206,44 @@ class TestBuilder:
         test_dir = temp_dir / 'project' / 'test_folder'
         test_files = [file for file in test_dir.iterdir() if file.is_file()]
         print("aaaaaaaaaaaaaaa:",test_files)
-        for test_file in test_files:
-            # print("****:",os.getcwd())
-            str_test_file = str(test_file)
+        # javac and node run as one subprocess per file, so check the files concurrently
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+            file_results = list(executor.map(lambda f: self._validate_file_syntax(f, language), test_files))
+        
+        for test_file, file_result in zip(test_files, file_results):
             file_name = str(test_file.name)
-            if not test_file.exists():
-                results['files'][file_name] = {
-                    'status': 'failed',
-                    'error': 'File not found'
-                }
-                results['status'] = 'failed'
-                continue
-            
-            try:
-                if language == 'python':
-                    self._validate_python_syntax(str_test_file)
-                elif language == 'java':
-                    self._validate_java_syntax(str_test_file)
-                elif language == 'javascript':
-                    self._validate_javascript_syntax(str_test_file)
-                
-                results['files'][file_name] = {'status': 'passed'}
-            
-            except Exception as e:
-                results['files'][file_name] = {
-                    'status': 'failed',
-                    'error': str(e)
-                }
+            results['files'][file_name] = file_result
+            if file_result['status'] != 'passed':
                 results['status'] = 'failed'
-                results['errors'].append(f"{file_name}: {str(e)}")
+                results['errors'].append(f"{file_name}: {file_result['error']}")
         
         return results
     
+    def _validate_file_syntax(self, test_file: Path, language: str) -> Dict[str, Any]:
+        """Validate the syntax of one test file"""
+        if not test_file.exists():
+            return {
+                'status': 'failed',
+                'error': 'File not found'
+            }
+        
+        str_test_file = str(test_file)
+        try:
+            if language == 'python':
+                self._validate_python_syntax(str_test_file)
+            elif language == 'java':
+                self._validate_java_syntax(str_test_file)
+            elif language == 'javascript':
+                self._validate_javascript_syntax(str_test_file)
+            
+            return {'status': 'passed'}
+        
+        except Exception as e:
+            return {
+                'status': 'failed',
+                'error': str(e)
+            }
+    
     def _validate_python_syntax(self, file_path: str):
         """Validate Python syntax"""
         with open(file_path, 'r') as f:
@@ -334,9 +341,8 @@ class TestBuilder:
             # Try to import test modules
             test_files = list(project_dir.glob('./test_folder/*.py'))
             
-            for test_file in test_files:
-                # print(test_file.name)
-                result = subprocess.run(
+            def compile_file(test_file: Path) -> subprocess.CompletedProcess:
+                return subprocess.run(
                     ['python', '-m', 'py_compile', str(test_file)],
                     capture_output=True,
                     text=True,
@@ -344,6 +350,11 @@ class TestBuilder:
                     timeout=30
                 )
             
+            # One interpreter start-up per file; run them concurrently
+            with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+                compile_results = list(executor.map(compile_file, test_files))
+            
+            for test_file, result in zip(test_files, compile_results):
                 if result.returncode != 0:
                     results['status'] = 'failed'
                     results['errors'].append(f"Import error in {test_file.name}: {result.stderr}")
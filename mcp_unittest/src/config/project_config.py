@@ -2,18 +2,38 @@
 Project Configuration Manager
 """
 import os
+import re
+import copy
 import json
-from typing import Dict, Any, Optional, List
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple, Iterator
 from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Files whose presence/mtime drives auto-detection in ``configure``
+_MARKER_FILES = (
+    'requirements.txt', 'setup.py', 'pyproject.toml', 'pytest.ini',
+    'pom.xml', 'build.gradle', 'build.gradle.kts', 'package.json'
+)
+
+# Splits a requirement line at its version specifier, extras or environment marker
+_VER_SPLIT = re.compile(r'[<>=!~;\s\[]')
+
+# Maximum number of entries kept in each in-memory cache
+_CACHE_MAX_ENTRIES = 128
+
 class ProjectConfig:
     """Manage project configuration for test generation"""
     
     def __init__(self):
         self.config_file_name = '.unittest_generator_config.json'
+        self._config_cache: "OrderedDict[str, Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self._configure_cache: "OrderedDict[tuple, Tuple[tuple, Dict[str, Any]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
     
     def configure(self, project_path: str, language: str, 
                  test_framework: Optional[str] = None, 
@@ -24,6 +44,13 @@ class ProjectConfig:
         if not project_path.exists():
             raise FileNotFoundError(f"Project path does not exist: {project_path}")
         
+        # Skip detection entirely if nothing relevant changed since last run
+        cache_key = (str(project_path), language, test_framework, build_tool)
+        cached = self._cache_get(self._configure_cache, cache_key)
+        if cached and cached[0] == self._project_signature(project_path):
+            # Callers get their own copy so edits can't leak into the cache
+            return copy.deepcopy(cached[1])
+        
         # Auto-detect configuration if not provided
         detected_config = self._auto_detect_config(project_path)
         
@@ -48,21 +75,75 @@ class ProjectConfig:
         except Exception as e:
             logger.warning(f"Failed to save configuration: {e}")
         
-        return config
+        # Signature is taken after saving so our own write doesn't invalidate it
+        self._cache_put(self._configure_cache, cache_key,
+                        (self._project_signature(project_path), config))
+        
+        return copy.deepcopy(config)
+    
+    def configure_many(self, projects: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Configure several projects concurrently, e.g. the packages of a monorepo.
+        
+        Each item holds the keyword arguments of ``configure``. Detection is
+        dominated by directory scans and stat calls, so threads overlap well.
+        Results are returned in the same order as ``projects``.
+        """
+        if not projects:
+            return []
+        
+        max_workers = min(32, (os.cpu_count() or 1) * 4, len(projects))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda p: self.configure(**p), projects))
     
     def load_config(self, project_path: str) -> Optional[Dict[str, Any]]:
         """Load existing project configuration"""
         config_file = Path(project_path) / self.config_file_name
         
-        if not config_file.exists():
+        try:
+            st = config_file.stat()
+        except OSError:
             return None
         
+        cache_key = str(config_file)
+        cached = self._cache_get(self._config_cache, cache_key)
+        if cached and cached[0] == st.st_mtime_ns:
+            return copy.deepcopy(cached[1])
+        
         try:
             with open(config_file, 'r') as f:
-                return json.load(f)
+                config = json.load(f)
         except Exception as e:
             logger.error(f"Failed to load configuration: {e}")
             return None
+        
+        self._cache_put(self._config_cache, cache_key, (st.st_mtime_ns, config))
+        return copy.deepcopy(config)
+    
+    def _project_signature(self, project_path: Path) -> tuple:
+        """Build a cheap change signature from the project dir and marker file mtimes"""
+        signature = []
+        for name in ('',) + _MARKER_FILES:
+            try:
+                signature.append((project_path / name).stat().st_mtime_ns)
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+    
+    def _cache_get(self, cache: OrderedDict, key):
+        """Look up a cache entry, marking it as most recently used"""
+        with self._cache_lock:
+            entry = cache.get(key)
+            if entry is not None:
+                cache.move_to_end(key)
+            return entry
+    
+    def _cache_put(self, cache: OrderedDict, key, value):
+        """Store a cache entry, evicting the least recently used one if full"""
+        with self._cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            if len(cache) > _CACHE_MAX_ENTRIES:
+                cache.popitem(last=False)
     
     def _auto_detect_config(self, project_path: Path) -> Dict[str, Any]:
         """Auto-detect project configuration"""
@@ -76,7 +157,8 @@ class ProjectConfig:
             config['build_tool'] = 'pip'
             
             if (project_path / 'pytest.ini').exists() or \
-               any(f.name.startswith('test_') for f in project_path.rglob('*.py')):
+               any(e.name.startswith('test_') and e.name.endswith('.py')
+                   for e in self._walk_files(project_path)):
                 config['test_framework'] = 'pytest'
             else:
                 config['test_framework'] = 'unittest'
@@ -126,7 +208,7 @@ class ProjectConfig:
             for candidate in candidates:
                 candidate_path = project_path / candidate
                 if candidate_path.exists() and candidate_path.is_dir():
-                    if any(f.suffix == '.py' for f in candidate_path.rglob('*')):
+                    if any(e.name.endswith('.py') for e in self._walk_files(candidate_path)):
                         source_dirs.append(str(candidate_path.relative_to(project_path)))
             
             # If no specific source dir found, use root
@@ -141,10 +223,14 @@ class ProjectConfig:
                 source_dirs.append(str(maven_src.relative_to(project_path)))
             else:
                 # Look for other Java source directories
-                for java_file in project_path.rglob('*.java'):
-                    src_dir = java_file.parent
-                    rel_path = str(src_dir.relative_to(project_path))
-                    if rel_path not in source_dirs and 'test' not in rel_path.lower():
+                seen = set()
+                root_len = len(self._root_prefix(project_path))
+                for entry in self._walk_files(project_path):
+                    if not entry.name.endswith('.java'):
+                        continue
+                    rel_path = os.path.dirname(entry.path)[root_len:] or '.'
+                    if rel_path not in seen and 'test' not in rel_path.lower():
+                        seen.add(rel_path)
                         source_dirs.append(rel_path)
         
         elif language == 'javascript':
@@ -153,7 +239,7 @@ class ProjectConfig:
             for candidate in candidates:
                 candidate_path = project_path / candidate
                 if candidate_path.exists() and candidate_path.is_dir():
-                    if any(f.suffix in ['.js', '.ts'] for f in candidate_path.rglob('*')):
+                    if any(e.name.endswith(('.js', '.ts')) for e in self._walk_files(candidate_path)):
                         source_dirs.append(str(candidate_path.relative_to(project_path)))
             
             # If no specific source dir found, use root
@@ -181,10 +267,14 @@ class ProjectConfig:
                 test_dirs.append(str(maven_test.relative_to(project_path)))
             else:
                 # Look for other test directories
-                for java_file in project_path.rglob('*Test.java'):
-                    test_dir = java_file.parent
-                    rel_path = str(test_dir.relative_to(project_path))
-                    if rel_path not in test_dirs:
+                seen = set()
+                root_len = len(self._root_prefix(project_path))
+                for entry in self._walk_files(project_path):
+                    if not entry.name.endswith('Test.java'):
+                        continue
+                    rel_path = os.path.dirname(entry.path)[root_len:] or '.'
+                    if rel_path not in seen:
+                        seen.add(rel_path)
                         test_dirs.append(rel_path)
         
         elif language == 'javascript':
@@ -205,6 +295,31 @@ class ProjectConfig:
         
         return test_dirs
     
+    def _root_prefix(self, root: Path) -> str:
+        """Prefix to slice off paths yielded by _walk_files to make them relative to root"""
+        return str(root).rstrip(os.sep) + os.sep
+    
+    def _walk_files(self, root: Path) -> Iterator[os.DirEntry]:
+        """Yield regular files under root without following symlinks.
+        
+        Symlinked directories are not descended into (so cyclic links can't
+        loop the walk) and sockets, FIFOs and other special files are skipped.
+        """
+        stack = [str(root)]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                yield entry
+                        except OSError:
+                            continue
+            except OSError as e:
+                logger.debug(f"Skipping unreadable directory: {e}")
+    
     def _detect_dependencies(self, project_path: Path, language: str) -> List[str]:
         """Detect project dependencies"""
         dependencies = []
@@ -218,7 +333,9 @@ class ProjectConfig:
                         for line in f:
                             line = line.strip()
                             if line and not line.startswith('#'):
-                                dependencies.append(line.split('==')[0].split('>=')[0].split('<=')[0])
+                                name = _VER_SPLIT.split(line, 1)[0]
+                                if name:
+                                    dependencies.append(name)
                 
                 # Read setup.py (basic parsing)
                 setup_file = project_path / 'setup.py'
@@ -2,57 +2,234 @@
 AI-powered Test Generator for Unit Test Generation
 """
 import os
+import re
 import json
-from typing import Dict, List, Any, Optional
+import time
+import hashlib
+import threading
+import itertools
+from pathlib import Path
+from string import Template
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator
 import logging
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 from dotenv import load_dotenv
-import openai
 load_dotenv(override=True)
 
 logger = logging.getLogger(__name__)
 
-class TestGenerator:
-    """AI-powered test generator using LLM services"""
+def _log_level() -> str:
+    """Level named by ``UT_LOG_LEVEL``, or INFO if it is not a known logging level"""
+    level = (os.getenv('UT_LOG_LEVEL') or 'INFO').upper()
+    # getLevelNamesMapping() is new in Python 3.11
+    names = getattr(logging, 'getLevelNamesMapping', lambda: logging._nameToLevel)()
+    if level not in names:
+        logger.warning(f"Unknown UT_LOG_LEVEL {level!r}, using INFO")
+        return 'INFO'
+    return level
+
+logger.setLevel(_log_level())
+
+# Upper bound on LLM requests in flight during a single ``generate`` call
+_MAX_CONCURRENT_REQUESTS = 10
+
+# Model and sampling settings shared by the LLM providers
+_OPENAI_MODEL = "gpt-4o-mini"
+_ANTHROPIC_MODEL = "claude-3-sonnet-20240229"
+_GROQ_MODEL = "llama-3.3-70b-versatile"
+_TEMPERATURE = 0.1
+_MAX_TOKENS = 2000
+
+# System message sent with every prompt. It must stay byte-identical between
+# calls for provider-side prompt caching to reuse it.
+_SYSTEM_MSG = (
+    "You are an expert software tester specializing in writing comprehensive unit tests. "
+    "Generate high-quality, well-structured test code."
+)
+
+# Small functions are sent to OpenAI in groups of this size; longer ones get their own request
+_BATCH_SIZE = 8
+_BATCH_MAX_FUNCTION_LINES = 80
+
+# On-disk LLM response cache; responses older than the TTL are regenerated
+_LLM_CACHE_DIR = Path(
+    os.getenv('UTCODEASSIST_CACHE_DIR', Path.home() / '.cache' / 'utcodeassist')
+) / 'llm'
+_LLM_CACHE_TTL = 7 * 24 * 3600
+
+# Keep-alive connection pool shared by every LLM request, created on first use
+_HTTP_CLIENT = None
+_HTTP_CLIENT_LOCK = threading.Lock()
+
+def _http_client():
+    """The shared ``httpx.Client``; httpx is imported only when a provider needs it"""
+    global _HTTP_CLIENT
+    with _HTTP_CLIENT_LOCK:
+        if _HTTP_CLIENT is None:
+            import httpx
+            _HTTP_CLIENT = httpx.Client(
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                timeout=60
+            )
+        return _HTTP_CLIENT
+
+# Seconds a rate-limited API key is skipped before it is tried again
+_RATE_LIMIT_COOLDOWN = 20
+
+def _api_keys(name: str) -> List[str]:
+    """API keys from ``<name>S`` (comma-separated), falling back to ``<name>``"""
+    keys = os.getenv(f'{name}S') or os.getenv(name) or ''
+    return [key.strip() for key in keys.split(',') if key.strip()]
+
+class _KeyRotation:
+    """Round-robin over per-key API clients, skipping keys that were just rate limited"""
     
-    def __init__(self):
-        self.openai_client = None
-        self.anthropic_client = None
-        self.groq_client = None  
-        self._init_clients()
-        self.templates = self._load_templates()
+    def __init__(self, clients: List[Any]):
+        self.clients = clients
+        self._next = itertools.cycle(range(len(clients)))
+        self._cooldown_until = [0.0] * len(clients)
+        self._lock = threading.Lock()
     
-    def _init_clients(self):
-        """Initialize AI clients"""
-        try:
-            openai_key = os.getenv('OPENAI_API_KEY')
-            if openai_key:
-                self.openai_client = openai.OpenAI(api_key=openai_key)
-                print("hooray")
-                logger.info("OpenAI client initialized")
-        except Exception as e:
-            logger.warning(f"Failed to initialize OpenAI client: {e}")
-        
-        # try:
-        #     anthropic_key = os.getenv('ANTHROPIC_API_KEY')
-        #     if anthropic_key:
-        #         self.anthropic_client = Anthropic(api_key=anthropic_key)
-        #         logger.info("Anthropic client initialized")
-        # except Exception as e:
-        # #     logger.warning(f"Failed to initialize Anthropic client: {e}")
-        # try:
-        #     groq_key = os.getenv('GROQ_API_KEY')
-        #     if groq_key:
-        #         print("Initializing Groq client")
-        #         self.groq_client = groq_key  
-        #         logger.info("Groq client initialized")
-        # except Exception as e:
-        #     logger.warning(f"Failed to initialize Groq client: {e}")
+    def _pick(self) -> int:
+        with self._lock:
+            now = time.monotonic()
+            for _ in self.clients:
+                index = next(self._next)
+                if self._cooldown_until[index] <= now:
+                    return index
+            # Every key is cooling down; use the one that recovers first
+            return min(range(len(self.clients)), key=self._cooldown_until.__getitem__)
     
-    def _load_templates(self) -> Dict[str, str]:
-        """Load test templates for different languages and frameworks"""
-        return {
-            'python_pytest': '''
+    def call(self, request: Callable[[Any], Any]) -> Any:
+        """Run ``request`` with the next available client, moving on to another key on HTTP 429"""
+        for attempt in range(len(self.clients)):
+            index = self._pick()
+            try:
+                return request(self.clients[index])
+            except Exception as e:
+                response = getattr(e, 'response', None)
+                status_code = getattr(e, 'status_code', None) or getattr(response, 'status_code', None)
+                if status_code != 429 or attempt == len(self.clients) - 1:
+                    raise
+                with self._lock:
+                    self._cooldown_until[index] = time.monotonic() + _RATE_LIMIT_COOLDOWN
+                logger.warning(f"API key {index + 1} rate limited, retrying with another key")
+
+def _rename(text: str, old: str, new: str) -> str:
+    """Replace the identifier ``old`` in ``text``.
+    
+    Only whole identifiers that are not attribute accesses are replaced, so
+    ``add_numbers`` and ``obj.add`` keep their names; a test named exactly
+    ``test_<old>`` follows the rename.
+    """
+    escaped = re.escape(old)
+    return re.sub(rf'(?<![\w.]){escaped}(?!\w)|(?<=\btest_){escaped}(?!\w)', lambda _: new, text)
+
+def _batch_tests(response: str) -> Optional[Dict[str, str]]:
+    """Return the ``tests`` object of a batch response, or None if it is malformed.
+    
+    Entries whose value is not a string are dropped.
+    """
+    try:
+        tests = json.loads(response).get('tests')
+    except (TypeError, ValueError, AttributeError):
+        return None
+    if not isinstance(tests, dict):
+        return None
+    return {number: code for number, code in tests.items() if isinstance(code, str)}
+
+# Default test framework and test file extension per language
+_DEFAULT_FRAMEWORKS = MappingProxyType({
+    'python': 'pytest',
+    'java': 'junit',
+    'javascript': 'jest'
+})
+_EXTENSIONS = MappingProxyType({
+    'python': 'py',
+    'java': 'java',
+    'javascript': 'js'
+})
+
+# LLM prompt templates. The parts shared by every target of a file come
+# first, so providers with prefix caching can reuse them across prompts.
+_FUNCTION_PROMPT = Template("""
+Generate comprehensive unit tests for the following $language function using $test_framework.
+$context
+Function to test:
+$section
+Generate only the test code without explanations.
+""")
+
+_FUNCTION_BATCH_PROMPT = Template("""
+Generate comprehensive unit tests for each of the following $language functions using $test_framework.
+$context$sections
+Respond with a JSON object of the form {"tests": {"1": "<test code for function 1>", "2": "<test code for function 2>"}}, with one entry per function number.
+Each value holds only the test code without explanations.
+""")
+
+_FUNCTION_CONTEXT = Template("""
+Requirements:
+1. Test all possible code paths and edge cases
+2. Include positive and negative test cases
+3. Test boundary conditions
+4. Use appropriate mocking for dependencies
+5. Follow $test_framework best practices
+6. Include descriptive test names and docstrings
+7. Aim for high code coverage
+
+Context:
+- Language: $language
+- File: $file_path
+- Imports: $imports
+""")
+
+_CLASS_CONTEXT = Template("""
+Requirements:
+1. Test all public methods
+2. Test constructor and initialization
+3. Test state changes and side effects
+4. Include setup and teardown methods
+5. Use appropriate mocking for dependencies
+6. Follow $test_framework best practices
+7. Include descriptive test names and docstrings
+8. Test error conditions and exceptions
+
+Context:
+- Language: $language
+- File: $file_path
+- Imports: $imports
+""")
+
+_FUNCTION_SECTION = Template("""```$language
+$code
+```
+
+Function details:
+- Name: $name
+- Parameters: $parameters
+- Complexity: $complexity
+""")
+
+_CLASS_PROMPT = Template("""
+Generate comprehensive unit tests for the following $language class using $test_framework.
+$context
+Class to test:
+```$language
+$code
+```
+
+Class details:
+- Name: $name
+- Methods: $methods
+- Base classes: $base_classes
+
+Generate only the test code without explanations.
+""")
+
+# Fallback test skeletons, keyed by "<language>_<framework>"
+_TEMPLATES = MappingProxyType({
+    'python_pytest': '''
 import pytest
 from unittest.mock import Mock, patch
 {imports}
@@ -69,7 +246,7 @@ class Test{class_name}:
         pass
 {test_methods}
 ''',
-            'java_junit': '''
+    'java_junit': '''
 import org.junit.jupiter.api.Test;
 import org.junit.jupiter.api.BeforeEach;
 import org.junit.jupiter.api.AfterEach;
@@ -99,7 +276,7 @@ public class {class_name}Test {{
 {test_methods}
 }}
 ''',
-            'javascript_jest': '''
+    'javascript_jest': '''
 const {{ {class_name} }} = require('{module_path}');
 
 describe('{class_name}', () => {{
@@ -115,7 +292,48 @@ describe('{class_name}', () => {{
 {test_methods}
 }});
 '''
-        }
+})
+
+class TestGenerator:
+    """AI-powered test generator using LLM services"""
+    
+    templates = _TEMPLATES
+    
+    def __init__(self):
+        self.openai_client = None
+        self.anthropic_client = None
+        self.groq_client = None  
+        self._init_clients()
+    
+    def _init_clients(self):
+        """Initialize AI clients"""
+        try:
+            openai_keys = _api_keys('OPENAI_API_KEY')
+            if openai_keys:
+                # Imported here so instances without a key skip the SDK import
+                import openai
+                # Every OpenAI request goes through the rotation, one SDK client per key
+                self.openai_client = _KeyRotation([
+                    openai.OpenAI(api_key=key, http_client=_http_client()) for key in openai_keys
+                ])
+                logger.info(f"OpenAI client initialized with {len(openai_keys)} key(s)")
+        except Exception as e:
+            logger.warning(f"Failed to initialize OpenAI client: {e}")
+        
+        # try:
+        #     anthropic_key = os.getenv('ANTHROPIC_API_KEY')
+        #     if anthropic_key:
+        #         self.anthropic_client = Anthropic(api_key=anthropic_key)
+        #         logger.info("Anthropic client initialized")
+        # except Exception as e:
+        # #     logger.warning(f"Failed to initialize Anthropic client: {e}")
+        # try:
+        #     groq_key = os.getenv('GROQ_API_KEY')
+        #     if groq_key:
+        #         self.groq_client = groq_key  
+        #         logger.info("Groq client initialized")
+        # except Exception as e:
+        #     logger.warning(f"Failed to initialize Groq client: {e}")
     
     def generate(self, analysis_result: Dict[str, Any], test_framework: Optional[str] = None, coverage_target: int = 80) -> Dict[str, Any]:
         """Generate unit tests based on code analysis"""
@@ -126,28 +344,20 @@ describe('{class_name}', () => {{
             test_framework = self._detect_test_framework(language, analysis_result)
         
         # Generate tests for each function and class
-        generated_tests = []
-        
-        # Generate tests for standalone functions
-        for func in analysis_result['functions']:
-            test_code = self._generate_function_test(func, analysis_result, test_framework)
-            if test_code:
-                generated_tests.append({
-                    'type': 'function',
-                    'target': func['name'],
-                    'test_code': test_code,
-                    'file_name': f"test_{func['name'].lower()}.{self._get_file_extension(language)}"
-                })
+        targets = [('function', func) for func in analysis_result['functions']]
+        targets += [('class', cls) for cls in analysis_result['classes']]
+        prompt_context = self._prompt_context(analysis_result, test_framework)
+        test_codes = self._generate_all(targets, analysis_result, test_framework, prompt_context)
         
-        # Generate tests for classes
-        for cls in analysis_result['classes']:
-            test_code = self._generate_class_test(cls, analysis_result, test_framework)
+        generated_tests = []
+        extension = self._get_file_extension(language)
+        for (target_type, target), test_code in zip(targets, test_codes):
             if test_code:
                 generated_tests.append({
-                    'type': 'class',
-                    'target': cls['name'],
+                    'type': target_type,
+                    'target': target['name'],
                     'test_code': test_code,
-                    'file_name': f"test_{cls['name'].lower()}.{self._get_file_extension(language)}"
+                    'file_name': f"test_{target['name'].lower()}.{extension}"
                 })
         
         return {
@@ -163,44 +373,176 @@ describe('{class_name}', () => {{
             }
         }
     
-    def _detect_test_framework(self, language: str, analysis_result: Dict[str, Any]) -> str:
-        """Detect appropriate test framework based on language and project structure"""
-        framework_map = {
-            'python': 'pytest',
-            'java': 'junit',
-            'javascript': 'jest'
+    def generate_stream(self, analysis_result: Dict[str, Any], test_framework: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Generate unit tests one target at a time, yielding ``(event, payload)`` pairs.
+        
+        With OpenAI the test code is streamed as ``delta`` events while the model
+        writes it. Every target then ends with a ``test`` event holding the same
+        entry ``generate`` returns in ``generated_tests``, and a final ``done``
+        event carries the totals.
+        """
+        language = analysis_result['language']
+        if not test_framework:
+            test_framework = self._detect_test_framework(language, analysis_result)
+        
+        extension = self._get_file_extension(language)
+        total_tests = 0
+        targets = [('function', func) for func in analysis_result['functions']]
+        targets += [('class', cls) for cls in analysis_result['classes']]
+        prompt_context = self._prompt_context(analysis_result, test_framework)
+        
+        for target_type, target in targets:
+            if self.openai_client:
+                prompt = self._create_target_prompt(target_type, target, analysis_result, test_framework, prompt_context)
+                chunks = []
+                try:
+                    for text in self._stream_with_openai(prompt):
+                        chunks.append(text)
+                        yield 'delta', {'target': target['name'], 'text': text}
+                    test_code = ''.join(chunks)
+                except Exception as e:
+                    logger.error(f"AI generation failed: {e}")
+                    test_code = None
+                if not test_code:
+                    if target_type == 'function':
+                        test_code = self._generate_template_based_test(target, analysis_result, test_framework)
+                    else:
+                        test_code = self._generate_template_based_class_test(target, analysis_result, test_framework)
+            else:
+                test_code = self._generate_target_test(target_type, target, analysis_result, test_framework, prompt_context)
+            
+            if test_code:
+                total_tests += 1
+                yield 'test', {
+                    'type': target_type,
+                    'target': target['name'],
+                    'test_code': test_code,
+                    'file_name': f"test_{target['name'].lower()}.{extension}"
+                }
+        
+        yield 'done', {
+            'language': language,
+            'test_framework': test_framework,
+            'total_tests': total_tests
         }
+    
+    def _generate_all(self, targets: List[Tuple[str, Dict[str, Any]]], analysis_result: Dict[str, Any], test_framework: str, prompt_context: Dict[str, Any]) -> List[str]:
+        """Generate the test code for each ``(type, item)`` target, in order.
+        
+        Every request costs one LLM round trip, so up to
+        ``_MAX_CONCURRENT_REQUESTS`` of them are issued at once.
+        """
+        def generate_one(target: Tuple[str, Dict[str, Any]]) -> str:
+            return self._generate_target_test(*target, analysis_result, test_framework, prompt_context)
+        
+        # Template-based fallback is cheap, keep it on the calling thread
+        if len(targets) < 2 or not (self.openai_client or self.anthropic_client or self.groq_client):
+            return [generate_one(target) for target in targets]
+        
+        # Targets whose prompts differ only by their own name share one request
+        representatives = self._dedupe_targets(targets, analysis_result, test_framework, prompt_context)
+        unique = sorted(set(representatives))
+        unique_targets = [targets[i] for i in unique]
+        
+        def run(job: List[int]) -> List[str]:
+            if len(job) == 1:
+                return [generate_one(unique_targets[job[0]])]
+            try:
+                funcs = [unique_targets[i][1] for i in job]
+                codes = self._generate_batch(funcs, analysis_result, test_framework, prompt_context)
+            except Exception as e:
+                logger.error(f"Batched AI generation failed: {e}")
+                codes = [None] * len(job)
+            # Functions missing from the batch response get their own request
+            return [code or generate_one(unique_targets[i]) for i, code in zip(job, codes)]
+        
+        jobs = self._plan_requests(unique_targets)
+        unique_codes = {}
+        max_workers = min(_MAX_CONCURRENT_REQUESTS, len(jobs))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for job, codes in zip(jobs, executor.map(run, jobs)):
+                for index, code in zip(job, codes):
+                    unique_codes[unique[index]] = code
         
+        test_codes = []
+        for (_, item), representative in zip(targets, representatives):
+            test_code = unique_codes[representative]
+            source_name = targets[representative][1]['name']
+            if test_code and source_name != item['name']:
+                test_code = _rename(test_code, source_name, item['name'])
+            test_codes.append(test_code)
+        return test_codes
+    
+    def _dedupe_targets(self, targets: List[Tuple[str, Dict[str, Any]]], analysis_result: Dict[str, Any], test_framework: str, prompt_context: Dict[str, Any]) -> List[int]:
+        """Map each target to the first target whose prompt matches it up to the target name"""
+        class_lines = [(cls['start_line'], cls['end_line']) for cls in analysis_result.get('classes', [])]
+        first_by_prompt = {}
+        representatives = []
+        for index, (target_type, item) in enumerate(targets):
+            # Tests call methods as attributes, which a rename leaves alone
+            if target_type == 'function' and any(start <= item['start_line'] <= end for start, end in class_lines):
+                representatives.append(index)
+                continue
+            prompt = self._create_target_prompt(target_type, item, analysis_result, test_framework, prompt_context)
+            key = (target_type, _rename(prompt, item['name'], '\0'))
+            representatives.append(first_by_prompt.setdefault(key, index))
+        return representatives
+    
+    def _generate_target_test(self, target_type: str, item: Dict[str, Any], analysis_result: Dict[str, Any], test_framework: str, prompt_context: Optional[Dict[str, Any]] = None) -> str:
+        """Generate the test for one function or class target"""
+        if target_type == 'function':
+            return self._generate_function_test(item, analysis_result, test_framework, prompt_context)
+        return self._generate_class_test(item, analysis_result, test_framework, prompt_context)
+    
+    def _plan_requests(self, targets: List[Tuple[str, Dict[str, Any]]]) -> List[List[int]]:
+        """Group target indices into LLM requests; only OpenAI handles batches"""
+        jobs = []
+        batch = []
+        for index, (target_type, item) in enumerate(targets):
+            length = item.get('end_line', 0) - item.get('start_line', 0)
+            if self.openai_client and target_type == 'function' and length < _BATCH_MAX_FUNCTION_LINES:
+                batch.append(index)
+                if len(batch) == _BATCH_SIZE:
+                    jobs.append(batch)
+                    batch = []
+            else:
+                jobs.append([index])
+        if batch:
+            jobs.append(batch)
+        return jobs
+    
+    def _detect_test_framework(self, language: str, analysis_result: Dict[str, Any]) -> str:
+        """Detect appropriate test framework based on language and project structure"""
         # TODO: Add logic to detect framework from project files
         # For now, return default framework for each language
-        return framework_map.get(language, 'unknown')
+        return _DEFAULT_FRAMEWORKS.get(language, 'unknown')
     
-    def _generate_function_test(self, func: Dict[str, Any], analysis_result: Dict[str, Any], test_framework: str) -> str:
+    def _generate_function_test(self, func: Dict[str, Any], analysis_result: Dict[str, Any], test_framework: str, prompt_context: Optional[Dict[str, Any]] = None) -> str:
         """Generate test for a standalone function"""
         if not self.openai_client and not self.anthropic_client and not self.groq_client:
             return self._generate_template_based_test(func, analysis_result, test_framework)
         
-        prompt = self._create_function_test_prompt(func, analysis_result, test_framework)
+        prompt = self._create_function_test_prompt(func, analysis_result, test_framework, prompt_context)
         
         try:
             if self.openai_client:
-                print("Using GPT for test generation")
+                logger.debug("Using GPT for test generation")
                 return self._generate_with_openai(prompt)
             elif self.anthropic_client:
                 return self._generate_with_anthropic(prompt)
             elif self.groq_client:
-                print("Using Groq for test generation")
+                logger.debug("Using Groq for test generation")
                 return self._generate_with_groq(prompt)
         except Exception as e:
             logger.error(f"AI generation failed: {e}")
             return self._generate_template_based_test(func, analysis_result, test_framework)
     
-    def _generate_class_test(self, cls: Dict[str, Any], analysis_result: Dict[str, Any], test_framework: str) -> str:
+    def _generate_class_test(self, cls: Dict[str, Any], analysis_result: Dict[str, Any], test_framework: str, prompt_context: Optional[Dict[str, Any]] = None) -> str:
         """Generate test for a class"""
         if not self.openai_client and not self.anthropic_client and not self.groq_client:
             return self._generate_template_based_class_test(cls, analysis_result, test_framework)
         
-        prompt = self._create_class_test_prompt(cls, analysis_result, test_framework)
+        prompt = self._create_class_test_prompt(cls, analysis_result, test_framework, prompt_context)
         
         try:
             if self.openai_client:
@@ -211,121 +553,248 @@ describe('{class_name}', () => {{
             logger.error(f"AI generation failed: {e}")
             return self._generate_template_based_class_test(cls, analysis_result, test_framework)
     
-    def _create_function_test_prompt(self, func: Dict[str, Any], analysis_result: Dict[str, Any], test_framework: str) -> str:
+    def _prompt_context(self, analysis_result: Dict[str, Any], test_framework: str) -> Dict[str, Any]:
+        """Requirements and file context blocks and the source lines, built once per file for all of its prompts"""
+        fields = {
+            'test_framework': test_framework,
+            'language': analysis_result['language'],
+            'file_path': analysis_result['file_path'],
+            'imports': analysis_result['imports']
+        }
+        return {
+            'function': _FUNCTION_CONTEXT.substitute(fields),
+            'class': _CLASS_CONTEXT.substitute(fields),
+            'lines': analysis_result['source_code'].split('\n')
+        }
+    
+    def _create_target_prompt(self, target_type: str, item: Dict[str, Any], analysis_result: Dict[str, Any], test_framework: str, prompt_context: Optional[Dict[str, Any]] = None) -> str:
+        """Create the prompt for one function or class target"""
+        if target_type == 'function':
+            return self._create_function_test_prompt(item, analysis_result, test_framework, prompt_context)
+        return self._create_class_test_prompt(item, analysis_result, test_framework, prompt_context)
+    
+    def _create_function_test_prompt(self, func: Dict[str, Any], analysis_result: Dict[str, Any], test_framework: str, prompt_context: Optional[Dict[str, Any]] = None) -> str:
         """Create prompt for function test generation"""
-        language = analysis_result['language']
-        source_code = analysis_result['source_code']
-        
-        prompt = f"""
-Generate comprehensive unit tests for the following {language} function using {test_framework}.
-
-Function to test:
-```{language}
-{self._extract_function_code(func, source_code)}
-```
-
-Requirements:
-1. Test all possible code paths and edge cases
-2. Include positive and negative test cases
-3. Test boundary conditions
-4. Use appropriate mocking for dependencies
-5. Follow {test_framework} best practices
-6. Include descriptive test names and docstrings
-7. Aim for high code coverage
-
-Function details:
-- Name: {func['name']}
-- Parameters: {func['parameters']}
-- Complexity: {func.get('complexity', 'unknown')}
-
-Context:
-- Language: {language}
-- File: {analysis_result['file_path']}
-- Imports: {analysis_result['imports']}
-
-Generate only the test code without explanations.
-"""
-        return prompt
+        prompt_context = prompt_context or self._prompt_context(analysis_result, test_framework)
+        return _FUNCTION_PROMPT.substitute(
+            language=analysis_result['language'],
+            test_framework=test_framework,
+            context=prompt_context['function'],
+            section=self._function_prompt_section(func, analysis_result, prompt_context['lines'])
+        )
+    
+    def _create_function_batch_prompt(self, funcs: List[Dict[str, Any]], analysis_result: Dict[str, Any], test_framework: str, prompt_context: Optional[Dict[str, Any]] = None) -> str:
+        """Create prompt asking for the tests of several functions at once"""
+        prompt_context = prompt_context or self._prompt_context(analysis_result, test_framework)
+        sections = ''.join(
+            f"\nFunction {number}:\n{self._function_prompt_section(func, analysis_result, prompt_context['lines'])}"
+            for number, func in enumerate(funcs, 1)
+        )
+        return _FUNCTION_BATCH_PROMPT.substitute(
+            language=analysis_result['language'],
+            test_framework=test_framework,
+            context=prompt_context['function'],
+            sections=sections
+        )
     
-    def _create_class_test_prompt(self, cls: Dict[str, Any], analysis_result: Dict[str, Any], test_framework: str) -> str:
+    def _function_prompt_section(self, func: Dict[str, Any], analysis_result: Dict[str, Any], lines: List[str]) -> str:
+        """Source and details of one function, as embedded in a prompt"""
+        return _FUNCTION_SECTION.substitute(
+            language=analysis_result['language'],
+            code=self._extract_function_code(func, lines),
+            name=func['name'],
+            parameters=func['parameters'],
+            complexity=func.get('complexity', 'unknown')
+        )
+    
+    def _create_class_test_prompt(self, cls: Dict[str, Any], analysis_result: Dict[str, Any], test_framework: str, prompt_context: Optional[Dict[str, Any]] = None) -> str:
         """Create prompt for class test generation"""
-        language = analysis_result['language']
-        source_code = analysis_result['source_code']
+        prompt_context = prompt_context or self._prompt_context(analysis_result, test_framework)
+        return _CLASS_PROMPT.substitute(
+            language=analysis_result['language'],
+            test_framework=test_framework,
+            context=prompt_context['class'],
+            code=self._extract_class_code(cls, prompt_context['lines']),
+            name=cls['name'],
+            methods=[m['name'] for m in cls.get('methods', [])],
+            base_classes=cls.get('base_classes', [])
+        )
+    
+    def _cached_llm(self, request: Callable[[str], str], model: str, prompt: str, valid: Callable[[str], bool] = bool) -> str:
+        """Return the cached response for a prompt, calling ``request`` on a miss.
         
-        prompt = f"""
-Generate comprehensive unit tests for the following {language} class using {test_framework}.
-
-Class to test:
-```{language}
-{self._extract_class_code(cls, source_code)}
-```
-
-Requirements:
-1. Test all public methods
-2. Test constructor and initialization
-3. Test state changes and side effects
-4. Include setup and teardown methods
-5. Use appropriate mocking for dependencies
-6. Follow {test_framework} best practices
-7. Include descriptive test names and docstrings
-8. Test error conditions and exceptions
-
-Class details:
-- Name: {cls['name']}
-- Methods: {[m['name'] for m in cls.get('methods', [])]}
-- Base classes: {cls.get('base_classes', [])}
-
-Context:
-- Language: {language}
-- File: {analysis_result['file_path']}
-- Imports: {analysis_result['imports']}
-
-Generate only the test code without explanations.
-"""
-        return prompt
+        Prompts are deterministic for unchanged source and sampling runs at a
+        low temperature, so an exact match on (model, settings, prompt) can
+        reuse the earlier response instead of paying for another round trip.
+        Responses rejected by ``valid`` are neither stored nor reused.
+        """
+        key = self._llm_cache_key(model, prompt)
+        response = self._llm_cache_load(key)
+        if response is None or not valid(response):
+            response = request(prompt)
+            if valid(response):
+                self._llm_cache_store(key, model, response)
+        return response
+    
+    def _llm_cache_key(self, model: str, prompt: str) -> str:
+        """Cache key for a prompt sent to ``model`` with the shared sampling settings.
+        
+        Trailing whitespace and blank lines in the template text don't change
+        what a test has to cover, so prompts differing only in those share a
+        key. Source inside ``` fences is hashed verbatim, since whitespace in
+        string literals and docstrings is part of the code under test.
+        """
+        lines = []
+        in_code = False
+        for line in prompt.split('\n'):
+            if line.startswith('```'):
+                in_code = not in_code
+            elif not in_code:
+                line = line.rstrip()
+                if not line:
+                    continue
+            lines.append(line)
+        normalized = '\n'.join(lines)
+        return hashlib.blake2b(
+            f"{model}\0{_TEMPERATURE}\0{_MAX_TOKENS}\0{_SYSTEM_MSG}\0{normalized}".encode(), digest_size=20
+        ).hexdigest()
+    
+    def _llm_cache_load(self, key: str) -> Optional[str]:
+        """Return the cached response for ``key``, or None if missing or expired"""
+        cache_file = _LLM_CACHE_DIR / f"{key}.json"
+        try:
+            if time.time() - cache_file.stat().st_mtime < _LLM_CACHE_TTL:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)['response']
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+    
+    def _llm_cache_store(self, key: str, model: str, response: str):
+        """Persist a non-empty response under ``key``"""
+        if not response:
+            return
+        
+        cache_file = _LLM_CACHE_DIR / f"{key}.json"
+        try:
+            _LLM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'model': model, 'response': response}, f)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.warning(f"Failed to write LLM response cache: {e}")
+    
+    def _generate_batch(self, funcs: List[Dict[str, Any]], analysis_result: Dict[str, Any], test_framework: str, prompt_context: Optional[Dict[str, Any]] = None) -> List[Optional[str]]:
+        """Generate tests for several functions with a single OpenAI request.
+        
+        Returns one entry per function, ``None`` where the response has no test for it.
+        """
+        prompt = self._create_function_batch_prompt(funcs, analysis_result, test_framework, prompt_context)
+        response = self._cached_llm(
+            self._request_openai_batch, _OPENAI_MODEL, prompt,
+            valid=lambda text: _batch_tests(text) is not None
+        )
+        tests = _batch_tests(response) or {}
+        return [tests.get(str(number)) or None for number in range(1, len(funcs) + 1)]
     
     def _generate_with_openai(self, prompt: str) -> str:
         """Generate test using OpenAI API"""
-        response = self.openai_client.chat.completions.create(
-            model="gpt-4o-mini",
+        return self._cached_llm(self._request_openai, _OPENAI_MODEL, prompt)
+    
+    def _generate_with_anthropic(self, prompt: str) -> str:
+        """Generate test using Anthropic API"""
+        return self._cached_llm(self._request_anthropic, _ANTHROPIC_MODEL, prompt)
+    
+    def _generate_with_groq(self, prompt: str) -> str:
+        """Generate test using Groq API"""
+        return self._cached_llm(self._request_groq, _GROQ_MODEL, prompt)
+    
+    def _request_openai(self, prompt: str) -> str:
+        """Send a prompt to the OpenAI API"""
+        response = self.openai_client.call(lambda client: client.chat.completions.create(
+            model=_OPENAI_MODEL,
             messages=[
-                {"role": "system", "content": "You are an expert software tester specializing in writing comprehensive unit tests. Generate high-quality, well-structured test code."},
+                {"role": "system", "content": _SYSTEM_MSG},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.1,
-            max_tokens=2000
-        )
+            temperature=_TEMPERATURE,
+            max_tokens=_MAX_TOKENS
+        ))
         return response.choices[0].message.content
     
-    def _generate_with_anthropic(self, prompt: str) -> str:
-        """Generate test using Anthropic API"""
+    def _stream_with_openai(self, prompt: str) -> Iterator[str]:
+        """Yield a test from the OpenAI API piece by piece as it is generated"""
+        key = self._llm_cache_key(_OPENAI_MODEL, prompt)
+        cached = self._llm_cache_load(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        stream = self.openai_client.call(lambda client: client.chat.completions.create(
+            model=_OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": _SYSTEM_MSG},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=_TEMPERATURE,
+            max_tokens=_MAX_TOKENS,
+            stream=True
+        ))
+        chunks = []
+        for chunk in stream:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                chunks.append(text)
+                yield text
+        self._llm_cache_store(key, _OPENAI_MODEL, ''.join(chunks))
+    
+    def _request_openai_batch(self, prompt: str) -> str:
+        """Send a batched prompt to the OpenAI API, asking for a JSON object back"""
+        response = self.openai_client.call(lambda client: client.chat.completions.create(
+            model=_OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": _SYSTEM_MSG},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=_TEMPERATURE,
+            max_tokens=_MAX_TOKENS * _BATCH_SIZE,
+            response_format={"type": "json_object"}
+        ))
+        return response.choices[0].message.content
+    
+    def _request_anthropic(self, prompt: str) -> str:
+        """Send a prompt to the Anthropic API"""
         response = self.anthropic_client.messages.create(
-            model="claude-3-sonnet-20240229",
-            max_tokens=2000,
-            temperature=0.1,
+            model=_ANTHROPIC_MODEL,
+            max_tokens=_MAX_TOKENS,
+            temperature=_TEMPERATURE,
+            system=[
+                {"type": "text", "text": _SYSTEM_MSG, "cache_control": {"type": "ephemeral"}}
+            ],
             messages=[
                 {"role": "user", "content": prompt}
             ]
         )
         return response.content[0].text
     
-    def _generate_with_groq(self, prompt: str) -> str:
-        """Generate test using Groq API"""
+    def _request_groq(self, prompt: str) -> str:
+        """Send a prompt to the Groq API"""
         url = "https://api.groq.com/openai/v1/chat/completions"
         headers = {
             "Authorization": f"Bearer {self.groq_client}",
             "Content-Type": "application/json"
         }
         data = {
-            "model": "llama-3.3-70b-versatile",
+            "model": _GROQ_MODEL,
             "messages": [
-                {"role": "system", "content": "You are an expert software engineer specializing in writing comprehensive unit tests. Generate high-quality, well-structured test code."},
+                {"role": "system", "content": _SYSTEM_MSG},
                 {"role": "user", "content": prompt}
             ],
-            "temperature": 0.1,
-            "max_tokens": 2000
+            "temperature": _TEMPERATURE,
+            "max_tokens": _MAX_TOKENS
         }
-        response = requests.post(url, headers=headers, json=data, timeout=60)
+        response = _http_client().post(url, headers=headers, json=data)
         response.raise_for_status()
         return response.json()["choices"][0]["message"]["content"]
     
@@ -381,10 +850,8 @@ Generate only the test code without explanations.
             test_methods=test_methods
         )
     
-    def _extract_function_code(self, func: Dict[str, Any], source_code: str) -> str:
-        """Extract function code from source"""
-        # print(source_code)
-        lines = source_code.split('\n')
+    def _extract_function_code(self, func: Dict[str, Any], lines: List[str]) -> str:
+        """Extract function code from the source lines"""
         start_line = func['start_line'] - 1  # Convert to 0-based index
         end_line = func['end_line']
         
@@ -392,9 +859,8 @@ Generate only the test code without explanations.
             return '\n'.join(lines[start_line:end_line])
         return f"# Function {func['name']} code not available"
     
-    def _extract_class_code(self, cls: Dict[str, Any], source_code: str) -> str:
-        """Extract class code from source"""
-        lines = source_code.split('\n')
+    def _extract_class_code(self, cls: Dict[str, Any], lines: List[str]) -> str:
+        """Extract class code from the source lines"""
         start_line = cls['start_line'] - 1  # Convert to 0-based index
         end_line = cls['end_line']
         
@@ -404,10 +870,5 @@ Generate only the test code without explanations.
     
     def _get_file_extension(self, language: str) -> str:
         """Get file extension for test files"""
-        extensions = {
-            'python': 'py',
-            'java': 'java',
-            'javascript': 'js'
-        }
-        return extensions.get(language, 'txt')
+        return _EXTENSIONS.get(language, 'txt')
 
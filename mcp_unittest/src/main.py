@@ -1,21 +1,29 @@
 """
-Main Flask application for MCP Unit Test Generator Server
+Main FastAPI application for MCP Unit Test Generator Server
 """
 import os
 import sys
+import json
+import asyncio
 import logging
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from mcp.server.fastmcp import FastMCP, Context  
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any
+import uvicorn
+from fastapi import FastAPI, Body, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from mcp.server.fastmcp import FastMCP, Context
 # Add src to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from src.mcp.server import MCPServer
+from src.mcp.backends import get_backend, init_backends, analyze_file, analysis_etag
 
-mcp = FastMCP(  
-    name="unittest-generator",  
-    instructions="A server for analyzing code and generating unit tests"  
-)  
+mcp = FastMCP(
+    name="unittest-generator",
+    instructions="A server for analyzing code and generating unit tests"
+)
 
 # Configure logging
 logging.basicConfig(
@@ -24,183 +32,229 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'unittest-generator-secret-key'
+app = FastAPI(title='MCP Unit Test Generator Server', version='1.0.0')
 
 # Enable CORS for all routes
-CORS(app, origins='*')
+app.add_middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
 
 # Initialize MCP Server
 mcp_server = MCPServer()
 
-@app.route('/health', methods=['GET'])
-def health_check():
+# Build the tool backends once at startup instead of per request
+init_backends()
+
+# Parsing is CPU-bound and holds the GIL, so /analyze runs in worker processes.
+# Each worker keeps its own analyzer and memory cache; the disk cache is shared.
+_ANALYZE_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+_ANALYZE_TIMEOUT = 30
+
+@app.get('/health')
+async def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return {
         'status': 'healthy',
         'service': 'MCP Unit Test Generator Server',
         'version': '1.0.0'
-    })
+    }
 
-@app.route('/mcp', methods=['POST'])
-def handle_mcp_request():
+@app.post('/mcp')
+async def handle_mcp_request(request_data: Dict[str, Any] = Body(default=None)):
     """Handle MCP protocol requests"""
     try:
-        request_data = request.get_json()
-        
         if not request_data:
-            return jsonify({
+            return JSONResponse({
                 'error': {
                     'code': -32700,
                     'message': 'Parse error: Invalid JSON'
                 }
-            }), 400
-        
+            }, status_code=400)
+
         logger.info(f"Received MCP request: {request_data.get('method', 'unknown')}")
-        
-        response = mcp_server.handle_request(request_data)
-        
-        return jsonify(response)
-    
+
+        # tools/list is static, so serve the pre-encoded payload directly
+        if request_data.get('method') == 'tools/list':
+            return Response(
+                mcp_server.tools_list_response_json(request_data.get('id')),
+                media_type='application/json'
+            )
+
+        # Tool calls block on parsing, LLM and build work; keep them off the event loop
+        return await asyncio.to_thread(mcp_server.handle_request, request_data)
+
     except Exception as e:
         logger.error(f"Error handling MCP request: {e}")
-        return jsonify({
+        return JSONResponse({
             'error': {
                 'code': -32603,
                 'message': f'Internal error: {str(e)}'
             }
-        }), 500
+        }, status_code=500)
 
-@app.route('/tools', methods=['GET'])
-def list_tools():
+@app.get('/tools')
+async def list_tools():
     """List available tools (for debugging)"""
     tools = list(mcp_server.tools.keys())
-    return jsonify({
+    return {
         'tools': tools,
         'count': len(tools)
-    })
+    }
 
-@app.route('/analyze', methods=['POST'])
-def analyze_code():
+@app.post('/analyze')
+async def analyze_code(request: Request, data: Dict[str, Any] = Body(default={})):
     """Direct endpoint for code analysis (for testing)"""
     try:
-        data = request.get_json()
         file_path = data.get('file_path')
         language = data.get('language')
-        
+
         if not file_path or not language:
-            return jsonify({
+            return JSONResponse({
                 'error': 'file_path and language are required'
-            }), 400
-        
-        from src.parsers.code_analyzer import CodeAnalyzer
-        analyzer = CodeAnalyzer()
-        result = analyzer.analyze(file_path, language)
-        
-        return jsonify(result)
-    
+            }, status_code=400)
+
+        # Clients holding the current analysis skip both the analysis and its encoding
+        etag = analysis_etag(file_path, language)
+        if request.headers.get('if-none-match') == etag:
+            return Response(status_code=304, headers={'ETag': etag})
+
+        loop = asyncio.get_running_loop()
+        result = await asyncio.wait_for(
+            loop.run_in_executor(_ANALYZE_POOL, analyze_file, file_path, language),
+            timeout=_ANALYZE_TIMEOUT
+        )
+        return JSONResponse(result, headers={'ETag': etag})
+
+    except asyncio.TimeoutError:
+        logger.error(f"Code analysis of {file_path} timed out")
+        return JSONResponse({
+            'error': f'Analysis timed out after {_ANALYZE_TIMEOUT} seconds'
+        }, status_code=504)
+
     except Exception as e:
         logger.error(f"Error in code analysis: {e}")
-        return jsonify({
+        return JSONResponse({
             'error': str(e)
-        }), 500
+        }, status_code=500)
 
-@app.route('/generate', methods=['POST'])
-def generate_tests():
+@app.post('/generate')
+async def generate_tests(data: Dict[str, Any] = Body(default={})):
     """Direct endpoint for test generation (for testing)"""
     try:
-        data = request.get_json()
         analysis_result = data.get('analysis_result')
         test_framework = data.get('test_framework')
         coverage_target = data.get('coverage_target', 80)
-        
+
         if not analysis_result:
-            return jsonify({
+            return JSONResponse({
                 'error': 'analysis_result is required'
-            }), 400
-        
-        from src.generators.test_generator import TestGenerator
-        generator = TestGenerator()
-        result = generator.generate(analysis_result, test_framework, coverage_target)
-        
-        return jsonify(result)
-    
+            }, status_code=400)
+
+        generator = get_backend('generator')
+        return await asyncio.to_thread(generator.generate, analysis_result, test_framework, coverage_target)
+
     except Exception as e:
         logger.error(f"Error in test generation: {e}")
-        return jsonify({
+        return JSONResponse({
             'error': str(e)
-        }), 500
+        }, status_code=500)
+
+@app.post('/generate/stream')
+async def generate_tests_stream(data: Dict[str, Any] = Body(default={})):
+    """Stream test generation progress as server-sent events"""
+    analysis_result = data.get('analysis_result')
+    test_framework = data.get('test_framework')
+
+    if not analysis_result:
+        return JSONResponse({
+            'error': 'analysis_result is required'
+        }, status_code=400)
+
+    generator = get_backend('generator')
 
-@app.route('/validate', methods=['POST'])
-def validate_tests():
+    # Sync iterators are drained in a worker thread by StreamingResponse
+    def events():
+        try:
+            for event, payload in generator.generate_stream(analysis_result, test_framework):
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            logger.error(f"Error in streamed test generation: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(events(), media_type='text/event-stream')
+
+@app.post('/validate')
+async def validate_tests(data: Dict[str, Any] = Body(default={})):
     """Direct endpoint for test validation (for testing)"""
     try:
-        data = request.get_json()
         test_files = data.get('test_files', [])
         project_path = data.get('project_path')
-        
+
         if not project_path:
-            return jsonify({
+            return JSONResponse({
                 'error': 'project_path is required'
-            }), 400
-        
-        from src.builders.test_builder import TestBuilder
-        builder = TestBuilder()
-        result = builder.build_and_validate(test_files, project_path)
-        
-        return jsonify(result)
-    
+            }, status_code=400)
+
+        builder = get_backend('builder')
+        return await asyncio.to_thread(builder.build_and_validate, test_files, project_path)
+
     except Exception as e:
         logger.error(f"Error in test validation: {e}")
-        return jsonify({
+        return JSONResponse({
             'error': str(e)
-        }), 500
+        }, status_code=500)
 
-@app.route('/configure', methods=['POST'])
-def configure_project():
+@app.post('/configure')
+async def configure_project(data: Dict[str, Any] = Body(default={})):
     """Direct endpoint for project configuration (for testing)"""
     try:
-        data = request.get_json()
         project_path = data.get('project_path')
         language = data.get('language')
         test_framework = data.get('test_framework')
         build_tool = data.get('build_tool')
-        
+
         if not project_path or not language:
-            return jsonify({
+            return JSONResponse({
                 'error': 'project_path and language are required'
-            }), 400
-        
-        from src.config.project_config import ProjectConfig
-        config = ProjectConfig()
-        result = config.configure(project_path, language, test_framework, build_tool)
-        
-        return jsonify(result)
-    
+            }, status_code=400)
+
+        config = get_backend('config')
+        return await asyncio.to_thread(config.configure, project_path, language, test_framework, build_tool)
+
     except Exception as e:
         logger.error(f"Error in project configuration: {e}")
-        return jsonify({
+        return JSONResponse({
             'error': str(e)
-        }), 500
+        }, status_code=500)
 
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({
-        'error': 'Endpoint not found'
-    }), 404
+@app.exception_handler(StarletteHTTPException)
+async def http_error(request: Request, error: StarletteHTTPException):
+    if error.status_code == 404:
+        return JSONResponse({
+            'error': 'Endpoint not found'
+        }, status_code=404)
+    return JSONResponse({
+        'error': error.detail
+    }, status_code=error.status_code)
 
-@app.errorhandler(500)
-def internal_error(error):
-    return jsonify({
+@app.exception_handler(Exception)
+async def internal_error(request: Request, error: Exception):
+    return JSONResponse({
         'error': 'Internal server error'
-    }), 500
+    }, status_code=500)
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('DEBUG', 'True').lower() == 'true'
-    
+    workers = int(os.getenv('WORKERS', 1))
+
     logger.info(f"Starting MCP Unit Test Generator Server on port {port}")
     logger.info(f"Debug mode: {debug}")
-    
-    app.run(host='0.0.0.0', port=port, debug=debug)
 
+    # Debug mode reloads on code changes, which runs a single worker
+    uvicorn.run(
+        'main:app',
+        host='0.0.0.0',
+        port=port,
+        reload=debug,
+        workers=workers,
+        log_level='debug' if debug else 'info'
+    )
@@ -0,0 +1,79 @@
+"""
+Shared backend instances and analysis cache for the tool handlers
+"""
+import os
+import json
+import hashlib
+import functools
+import importlib
+import logging
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Tool results go out compact; set MCP_PRETTY_JSON=true to indent them for debugging
+_PRETTY_JSON = os.getenv('MCP_PRETTY_JSON', 'False').lower() == 'true'
+
+try:
+    import orjson
+
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if _PRETTY_JSON else 0)
+
+    def encode_result(obj: Any) -> str:
+        """Serialize a tool result to JSON text"""
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode()
+except ImportError:
+    if _PRETTY_JSON:
+        encode_result = json.JSONEncoder(indent=2, ensure_ascii=False).encode
+    else:
+        encode_result = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+
+# Backend name -> (module, class)
+_BACKEND_SPECS = {
+    'analyzer': ('src.parsers.code_analyzer', 'CodeAnalyzer'),
+    'generator': ('src.generators.test_generator', 'TestGenerator'),
+    'builder': ('src.builders.test_builder', 'TestBuilder'),
+    'config': ('src.config.project_config', 'ProjectConfig'),
+}
+
+_BACKENDS: Dict[str, Any] = {}
+
+def get_backend(name: str) -> Any:
+    """Return the shared instance of a backend, creating it on first use"""
+    backend = _BACKENDS.get(name)
+    if backend is None:
+        module_name, class_name = _BACKEND_SPECS[name]
+        module = importlib.import_module(module_name)
+        backend = _BACKENDS[name] = getattr(module, class_name)()
+    return backend
+
+def init_backends():
+    """Create all backends up front; ones whose imports fail are retried on first use"""
+    for name in _BACKEND_SPECS:
+        try:
+            get_backend(name)
+        except ImportError as e:
+            logger.warning(f"Deferring {name} backend initialization: {e}")
+
+@functools.lru_cache(maxsize=512)
+def _analyze_cached(file_path: str, mtime_ns: int, size: int, language: str) -> Dict[str, Any]:
+    """
+    Analyze a file, reusing earlier results for identical content.
+
+    The in-memory layer is keyed by (path, mtime, size) so an unchanged file
+    costs a single stat; misses fall through to the analyzer's persistent
+    content-hash cache, which survives restarts. Files edited between calls
+    are re-parsed incrementally from their previous tree.
+    """
+    return get_backend('analyzer').analyze_incremental(file_path, language)
+
+def analyze_file(file_path: str, language: str) -> Dict[str, Any]:
+    """Analyze a file through the analysis cache; invalidated by mtime/size changes"""
+    st = os.stat(file_path)
+    return _analyze_cached(file_path, st.st_mtime_ns, st.st_size, language)
+
+def analysis_etag(file_path: str, language: str) -> str:
+    """Entity tag for a file's analysis; changes whenever analyze_file would re-analyze"""
+    st = os.stat(file_path)
+    key = f"{file_path}\0{language}\0{st.st_mtime_ns}\0{st.st_size}".encode()
+    return f'"{hashlib.blake2b(key, digest_size=12).hexdigest()}"'
@@ -1,34 +1,184 @@
 """
 MCP Protocol Handler for Unit Test Generator Server
 """
-from typing import Dict, List, Any, Optional
-from pydantic import BaseModel
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Mapping
 import json
 import logging
 
+from src.mcp.backends import get_backend
+
 logger = logging.getLogger(__name__)
 
-class MCPRequest(BaseModel):
+@dataclass(slots=True)
+class MCPRequest:
     """MCP Request model"""
     method: str
     params: Optional[Dict[str, Any]] = None
     id: Optional[str] = None
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MCPRequest":
+        """Build a request from raw JSON, ignoring unknown keys such as 'jsonrpc'"""
+        method = data.get("method")
+        if not isinstance(method, str):
+            raise ValueError("Invalid request: 'method' must be a string")
+        
+        params = data.get("params")
+        if params is not None and not isinstance(params, dict):
+            raise ValueError("Invalid request: 'params' must be an object")
+        
+        return cls(method=method, params=params, id=data.get("id"))
 
-class MCPResponse(BaseModel):
+@dataclass(slots=True)
+class MCPResponse:
     """MCP Response model"""
     result: Optional[Dict[str, Any]] = None
     error: Optional[Dict[str, Any]] = None
     id: Optional[str] = None
 
-class MCPTool(BaseModel):
+@dataclass(slots=True, frozen=True)
+class MCPTool:
     """MCP Tool definition"""
     name: str
     description: str
-    inputSchema: Dict[str, Any]
+    inputSchema: Mapping[str, Any]
+
+_SCHEMA_ANALYZE_CODE = MappingProxyType({
+    "type": "object",
+    "properties": {
+        "file_path": {
+            "type": "string",
+            "description": "Path to the source code file to analyze"
+        },
+        "language": {
+            "type": "string",
+            "enum": ["python", "java", "javascript"],
+            "description": "Programming language of the source code"
+        }
+    },
+    "required": ["file_path", "language"]
+})
+
+_SCHEMA_GENERATE_TESTS = MappingProxyType({
+    "type": "object",
+    "properties": {
+        "analysis_result": {
+            "type": "object",
+            "description": "Code analysis result from analyze_code tool"
+        },
+        "test_framework": {
+            "type": "string",
+            "description": "Testing framework to use (pytest, junit, jest, etc.)"
+        },
+        "coverage_target": {
+            "type": "number",
+            "minimum": 0,
+            "maximum": 100,
+            "default": 80,
+            "description": "Target code coverage percentage"
+        }
+    },
+    "required": ["analysis_result"]
+})
+
+_SCHEMA_BUILD_AND_VALIDATE = MappingProxyType({
+    "type": "object",
+    "properties": {
+        "test_files": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "List of generated test file paths"
+        },
+        "project_path": {
+            "type": "string",
+            "description": "Path to the project root directory"
+        }
+    },
+    "required": ["test_files", "project_path"]
+})
+
+_SCHEMA_CONFIGURE_PROJECT = MappingProxyType({
+    "type": "object",
+    "properties": {
+        "project_path": {
+            "type": "string",
+            "description": "Path to the project root directory"
+        },
+        "language": {
+            "type": "string",
+            "enum": ["python", "java", "javascript"],
+            "description": "Primary programming language of the project"
+        },
+        "test_framework": {
+            "type": "string",
+            "description": "Preferred testing framework"
+        },
+        "build_tool": {
+            "type": "string",
+            "description": "Build tool used in the project (maven, gradle, npm, etc.)"
+        },
+        "projects": {
+            "type": "array",
+            "items": {"type": "object"},
+            "description": "Configure several projects at once; each item takes the arguments above"
+        }
+    },
+    "anyOf": [
+        {"required": ["project_path", "language"]},
+        {"required": ["projects"]}
+    ]
+})
+
+# Tool definitions are immutable, so they are built once at import time
+_TOOLS = (
+    MCPTool(
+        name="analyze_code",
+        description="Analyze source code and extract metadata for test generation",
+        inputSchema=_SCHEMA_ANALYZE_CODE
+    ),
+    MCPTool(
+        name="generate_tests",
+        description="Generate unit tests for analyzed code",
+        inputSchema=_SCHEMA_GENERATE_TESTS
+    ),
+    MCPTool(
+        name="build_and_validate",
+        description="Build and validate generated unit tests",
+        inputSchema=_SCHEMA_BUILD_AND_VALIDATE
+    ),
+    MCPTool(
+        name="configure_project",
+        description="Configure project settings for test generation",
+        inputSchema=_SCHEMA_CONFIGURE_PROJECT
+    )
+)
+
+_TOOLS_LIST = [
+    {"name": tool.name, "description": tool.description, "inputSchema": dict(tool.inputSchema)}
+    for tool in _TOOLS
+]
+
+# Serialized once so the HTTP transport can send tools/list without re-encoding
+_TOOLS_LIST_RESULT_JSON = json.dumps({"tools": _TOOLS_LIST})
 
 class MCPServer:
     """MCP Server implementation for Unit Test Generator"""
     
+    # JSON-RPC error codes
+    METHOD_NOT_FOUND = -32601
+    INVALID_PARAMS = -32602
+    INTERNAL_ERROR = -32603
+    
+    # Pre-assembled error payloads for errors whose message never varies
+    _ERROR_TEMPLATES = {
+        (INVALID_PARAMS, "Missing parameters"): {
+            "code": INVALID_PARAMS,
+            "message": "Missing parameters"
+        }
+    }
+    
     def __init__(self):
         self.tools = {}
         self.capabilities = {
@@ -40,103 +190,12 @@ class MCPServer:
     
     def _register_tools(self):
         """Register all available tools"""
-        self.tools = {
-            "analyze_code": MCPTool(
-                name="analyze_code",
-                description="Analyze source code and extract metadata for test generation",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "file_path": {
-                            "type": "string",
-                            "description": "Path to the source code file to analyze"
-                        },
-                        "language": {
-                            "type": "string",
-                            "enum": ["python", "java", "javascript"],
-                            "description": "Programming language of the source code"
-                        }
-                    },
-                    "required": ["file_path", "language"]
-                }
-            ),
-            "generate_tests": MCPTool(
-                name="generate_tests",
-                description="Generate unit tests for analyzed code",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "analysis_result": {
-                            "type": "object",
-                            "description": "Code analysis result from analyze_code tool"
-                        },
-                        "test_framework": {
-                            "type": "string",
-                            "description": "Testing framework to use (pytest, junit, jest, etc.)"
-                        },
-                        "coverage_target": {
-                            "type": "number",
-                            "minimum": 0,
-                            "maximum": 100,
-                            "default": 80,
-                            "description": "Target code coverage percentage"
-                        }
-                    },
-                    "required": ["analysis_result"]
-                }
-            ),
-            "build_and_validate": MCPTool(
-                name="build_and_validate",
-                description="Build and validate generated unit tests",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "test_files": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "List of generated test file paths"
-                        },
-                        "project_path": {
-                            "type": "string",
-                            "description": "Path to the project root directory"
-                        }
-                    },
-                    "required": ["test_files", "project_path"]
-                }
-            ),
-            "configure_project": MCPTool(
-                name="configure_project",
-                description="Configure project settings for test generation",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "project_path": {
-                            "type": "string",
-                            "description": "Path to the project root directory"
-                        },
-                        "language": {
-                            "type": "string",
-                            "enum": ["python", "java", "javascript"],
-                            "description": "Primary programming language of the project"
-                        },
-                        "test_framework": {
-                            "type": "string",
-                            "description": "Preferred testing framework"
-                        },
-                        "build_tool": {
-                            "type": "string",
-                            "description": "Build tool used in the project (maven, gradle, npm, etc.)"
-                        }
-                    },
-                    "required": ["project_path", "language"]
-                }
-            )
-        }
+        self.tools = {tool.name: tool for tool in _TOOLS}
     
     def handle_request(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle incoming MCP request"""
         try:
-            request = MCPRequest(**request_data)
+            request = MCPRequest.from_dict(request_data)
             
             if request.method == "initialize":
                 return self._handle_initialize(request)
@@ -147,7 +206,7 @@ class MCPServer:
             else:
                 return self._create_error_response(
                     request.id,
-                    -32601,
+                    self.METHOD_NOT_FOUND,
                     f"Method not found: {request.method}"
                 )
         
@@ -155,7 +214,7 @@ class MCPServer:
             logger.error(f"Error handling request: {e}")
             return self._create_error_response(
                 None,
-                -32603,
+                self.INTERNAL_ERROR,
                 f"Internal error: {str(e)}"
             )
     
@@ -175,20 +234,23 @@ class MCPServer:
     
     def _handle_tools_list(self, request: MCPRequest) -> Dict[str, Any]:
         """Handle tools list request"""
-        tools_list = [tool.dict() for tool in self.tools.values()]
         return {
             "result": {
-                "tools": tools_list
+                "tools": _TOOLS_LIST
             },
             "id": request.id
         }
     
+    def tools_list_response_json(self, request_id: Optional[str]) -> str:
+        """Serialized tools/list response, built from the pre-encoded tool list"""
+        return '{"result": ' + _TOOLS_LIST_RESULT_JSON + ', "id": ' + json.dumps(request_id) + '}'
+    
     def _handle_tools_call(self, request: MCPRequest) -> Dict[str, Any]:
         """Handle tools call request"""
         if not request.params:
             return self._create_error_response(
                 request.id,
-                -32602,
+                self.INVALID_PARAMS,
                 "Missing parameters"
             )
         
@@ -198,20 +260,18 @@ class MCPServer:
         if tool_name not in self.tools:
             return self._create_error_response(
                 request.id,
-                -32602,
+                self.INVALID_PARAMS,
                 f"Unknown tool: {tool_name}"
             )
         
         try:
-            # Import and call the appropriate handler
+            # Dispatch to the shared backend instances
             if tool_name == "analyze_code":
-                from src.parsers.code_analyzer import CodeAnalyzer
-                analyzer = CodeAnalyzer()
+                analyzer = get_backend('analyzer')
                 result = analyzer.analyze(arguments["file_path"], arguments["language"])
             
             elif tool_name == "generate_tests":
-                from src.generators.test_generator import TestGenerator
-                generator = TestGenerator()
+                generator = get_backend('generator')
                 result = generator.generate(
                     arguments["analysis_result"],
                     arguments.get("test_framework"),
@@ -219,22 +279,23 @@ class MCPServer:
                 )
             
             elif tool_name == "build_and_validate":
-                from src.builders.test_builder import TestBuilder
-                builder = TestBuilder()
+                builder = get_backend('builder')
                 result = builder.build_and_validate(
                     arguments["test_files"],
                     arguments["project_path"]
                 )
             
             elif tool_name == "configure_project":
-                from src.config.project_config import ProjectConfig
-                config = ProjectConfig()
-                result = config.configure(
-                    arguments["project_path"],
-                    arguments["language"],
-                    arguments.get("test_framework"),
-                    arguments.get("build_tool")
-                )
+                config = get_backend('config')
+                if "projects" in arguments:
+                    result = config.configure_many(arguments["projects"])
+                else:
+                    result = config.configure(
+                        arguments["project_path"],
+                        arguments["language"],
+                        arguments.get("test_framework"),
+                        arguments.get("build_tool")
+                    )
             
             return {
                 "result": {
@@ -252,12 +313,16 @@ class MCPServer:
             logger.error(f"Error executing tool {tool_name}: {e}")
             return self._create_error_response(
                 request.id,
-                -32603,
+                self.INTERNAL_ERROR,
                 f"Tool execution error: {str(e)}"
             )
     
     def _create_error_response(self, request_id: Optional[str], code: int, message: str) -> Dict[str, Any]:
         """Create error response"""
+        template = self._ERROR_TEMPLATES.get((code, message))
+        if template is not None:
+            return {"error": template, "id": request_id}
+        
         return {
             "error": {
                 "code": code,
@@ -1,14 +1,22 @@
 """  
 Unit Test Generator MCP Server using FastMCP  
 """  
+import asyncio
 import json  
 import logging  
 from typing import Dict, Any  
   
 from mcp.server.fastmcp import FastMCP, Context  
   
+from src.mcp.backends import get_backend, init_backends, analyze_file, encode_result
+  
 logger = logging.getLogger(__name__)  
+
+# Build the tool backends once at startup instead of per call
+init_backends()
   
+_SUPPORTED_LANGUAGES = frozenset({"python", "java", "javascript"})
+
 # Create FastMCP server instance  
 mcp = FastMCP(  
     name="unittest-generator",  
@@ -24,14 +32,12 @@ def analyze_code(file_path: str, language: str) -> str:
         file_path: Path to the source code file to analyze  
         language: Programming language (python, java, javascript)  
     """  
-    if language not in ["python", "java", "javascript"]:  
+    if language not in _SUPPORTED_LANGUAGES:  
         raise ValueError(f"Unsupported language: {language}")  
       
     try:  
-        from src.parsers.code_analyzer import CodeAnalyzer  
-        analyzer = CodeAnalyzer()  
-        result = analyzer.analyze(file_path, language)  
-        return json.dumps(result, indent=2)  
+        result = analyze_file(file_path, language)  
+        return encode_result(result)  
     except Exception as e:  
         logger.error(f"Error analyzing code: {e}")  
         raise  
@@ -59,14 +65,13 @@ async def generate_tests(
             await ctx.info(f"Generating tests with {coverage_target}% coverage target")  
             await ctx.report_progress(0, 100, "Starting test generation")  
           
-        from src.generators.test_generator import TestGenerator  
-        generator = TestGenerator()  
-        result = generator.generate(analysis_result, test_framework, coverage_target)  
+        generator = get_backend('generator')  
+        result = await asyncio.to_thread(generator.generate, analysis_result, test_framework, coverage_target)  
           
         if ctx:  
             await ctx.report_progress(100, 100, "Test generation complete")  
           
-        return json.dumps(result, indent=2)  
+        return encode_result(result)  
     except Exception as e:  
         logger.error(f"Error generating tests: {e}")  
         if ctx:  
@@ -87,14 +92,13 @@ async def build_and_validate(test_files: list[str], project_path: str, ctx: Cont
             await ctx.info(f"Validating {len(test_files)} test files")  
             await ctx.report_progress(0, len(test_files), "Starting validation")  
           
-        from src.builders.test_builder import TestBuilder  
-        builder = TestBuilder()  
-        result = builder.build_and_validate(test_files, project_path)  
+        builder = get_backend('builder')  
+        result = await asyncio.to_thread(builder.build_and_validate, test_files, project_path)  
           
         if ctx:  
             await ctx.report_progress(len(test_files), len(test_files), "Validation complete")  
           
-        return json.dumps(result, indent=2)  
+        return encode_result(result)  
     except Exception as e:  
         logger.error(f"Error building/validating tests: {e}")  
         if ctx:  
@@ -117,14 +121,13 @@ def configure_project(
         test_framework: Preferred testing framework  
         build_tool: Build tool used in the project (maven, gradle, npm, etc.)  
     """  
-    if language not in ["python", "java", "javascript"]:  
+    if language not in _SUPPORTED_LANGUAGES:  
         raise ValueError(f"Unsupported language: {language}")  
       
     try:  
-        from src.config.project_config import ProjectConfig  
-        config = ProjectConfig()  
+        config = get_backend('config')  
         result = config.configure(project_path, language, test_framework, build_tool)  
-        return json.dumps(result, indent=2)  
+        return encode_result(result)  
     except Exception as e:  
         logger.error(f"Error configuring project: {e}")  
         raise  
@@ -3,10 +3,12 @@ Unit Test Generator MCP Server with HTTP Transport
 """  
 import os  
 import sys  
+import asyncio
 import logging  
 import json
+import weakref
 from contextlib import asynccontextmanager  
-from typing import Dict, Any  
+from typing import Dict, Any, Optional
   
 # Add src to path  
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))  
@@ -19,11 +21,11 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'  
 )  
 logger = logging.getLogger(__name__)  
-  
-# Create FastMCP server instance with HTTP transport settings  
-mcp = FastMCP(  
-    name="unittest-generator",  
-    prompts="""
+
+_SUPPORTED_LANGUAGES = frozenset({"python", "java", "javascript"})
+
+# Server-level workflow overview passed to FastMCP
+_SERVER_PROMPTS = """
     -A server for analyzing code and generating unit tests
     -The complete workflow should be: 
         + Create the source file that need to generate unit test in src_folder folder
@@ -32,7 +34,12 @@ mcp = FastMCP(
         + Generate tests for the code (use pytest for python)
         + Create a test files to store the test in test_folder
         + Use build_and_validate for the test files have just created
-    """,  
+    """
+
+# Create FastMCP server instance with HTTP transport settings  
+mcp = FastMCP(  
+    name="unittest-generator",  
+    prompts=_SERVER_PROMPTS,  
     # host="0.0.0.0",  
     # port=int(os.getenv('PORT', 8000)),  
     debug=os.getenv('DEBUG', 'True').lower() == 'true'  
@@ -41,10 +48,12 @@ mcp = FastMCP(
 import os
 from pathlib import Path
 import shutil
+import hashlib
+import mmap
+import functools
 
-@mcp.prompt(description="Instruction for creating unit test with given set of tools")
-def get_unit_test_instruction():
-    return (
+# Workflow instruction served by the get_unit_test_instruction prompt
+_UNIT_TEST_INSTRUCTION = (
     "1. The workflow should be implemented in a virtual environment \n"
     "2. Pass the appropriate arguments to each function. You should decide the naming of the files.\n"
     "3. If a tool fails, reconsider the arguments you provided.\n"
@@ -60,15 +69,57 @@ def get_unit_test_instruction():
     "        - If test execution fails, attempt to enter the virtual environment and run the tests manually using a shell command.\n"
     "7. This is the final step: after the workflow is complete, ask the user if they want to create the test in their workspace.\n"
     "   Do not use create_file_in_virtual_env for this step.\n"
-    )
+)
+
+@mcp.prompt(description="Instruction for creating unit test with given set of tools")
+def get_unit_test_instruction():
+    return _UNIT_TEST_INSTRUCTION
+
 
+@functools.lru_cache(maxsize=16)
+def _abs_folder(folder: str) -> str:
+    """Absolute path of a workspace folder; the server never changes its cwd"""
+    return os.path.abspath(folder)
+
+def _clear_folder(folder: str, keep: Optional[str] = None):
+    """
+    Remove everything in folder except the entry named keep.
+
+    Entry types come from the directory listing itself, so no per-entry stat
+    is needed, and an already-empty folder costs a single directory read.
+    """
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.name == keep:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+
+def _file_has_content(path: Path, data: bytes) -> bool:
+    """Check whether the file at path already holds exactly data, without reading it into memory"""
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size != len(data):
+                return False
+            if size == 0:
+                return True
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return hashlib.sha256(mm).digest() == hashlib.sha256(data).digest()
+    except OSError:
+        return False
+
+# Working directory the server was started in; nothing in the server changes it
+_CWD = os.getcwd()
 
 @mcp.tool(description="Get the path to the virtual environment")  
 def get_virtual_env_path():
     """
     Get the path to the virtual environment.
     """
-    return os.getcwd()
+    return _CWD
 
 @mcp.tool(description="Create a file in a virtual environment that include the input code if needed, folder argument should be either \"src_folder\" or \"test_folder\"")  
 def create_file_in_virtual_env(file_name: str, content: str, overwrite: bool = False, folder: str = "src_folder") -> dict:
@@ -104,42 +155,45 @@ def create_file_in_virtual_env(file_name: str, content: str, overwrite: bool = F
                 "file_path": file_name
             }
 
-        # Clear folder contents before creating new file
-        for item in folder_path.iterdir():
-            try:
-                if item.is_file():
-                    item.unlink()
-                elif item.is_dir():
-                    shutil.rmtree(item)
-            except Exception as cleanup_err:
-                return {
-                    "success": False,
-                    "error": f"Failed to clear folder contents: {cleanup_err}",
-                    "file_path": file_name
-                }
-
         # Construct full path
         path = folder_path / file_name
-        path.parent.mkdir(parents=True, exist_ok=True)
 
-        # Check if file exists
+        # Check if file exists before clearing anything
         if path.exists() and not overwrite:
             return {
                 "success": False,
                 "error": f"File {file_name} already exists. Use overwrite=True to replace it.",
-                "file_path": str(path.absolute())
+                "file_path": os.path.join(_abs_folder(folder), file_name)
             }
 
-        # Write content to file
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        data = content.encode('utf-8')
+
+        # An identical file directly in the folder is kept as-is instead of rewritten
+        unchanged = overwrite and path.parent == folder_path and _file_has_content(path, data)
+
+        # Clear folder contents before creating new file
+        try:
+            _clear_folder(folder, keep=path.name if unchanged else None)
+        except Exception as cleanup_err:
+            return {
+                "success": False,
+                "error": f"Failed to clear folder contents: {cleanup_err}",
+                "file_path": file_name
+            }
+
+        if not unchanged:
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+            # Write content to file, encoding it only once
+            with open(path, 'wb') as f:
+                f.write(data)
 
         return {
             "success": True,
             "message": f"File created successfully: {file_name}",
-            "file_path": str(path.absolute()),
-            "size_bytes": len(content.encode('utf-8')),
-            "lines_count": len(content.splitlines())
+            "file_path": os.path.join(_abs_folder(folder), file_name),
+            "size_bytes": len(data),
+            "lines_count": content.count('\n') + (1 if content and not content.endswith('\n') else 0)
         }
 
     except Exception as e:
@@ -149,7 +203,34 @@ def create_file_in_virtual_env(file_name: str, content: str, overwrite: bool = F
             "file_path": file_name
         }
 
-analysis = None
+from src.mcp.backends import get_backend, init_backends, analyze_file, encode_result
+
+# Build the tool backends once at startup instead of per call
+init_backends()
+
+# Latest analysis per client session, used when generate_tests isn't passed one.
+# Keyed weakly on the session object itself: an entry goes away with its session,
+# and a new session can never pick up a dead one's analysis through a reused id().
+_SESSION_ANALYSES: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+class _NoSession:
+    """Stands in for the session of calls made without a request context"""
+
+_NO_SESSION = _NoSession()
+
+def _session_key(ctx: Optional[Context]) -> Any:
+    """Key identifying the client session a tool call belongs to"""
+    if ctx is None:
+        return _NO_SESSION
+    try:
+        return ctx.session
+    except ValueError:
+        # Called outside of a request context
+        return _NO_SESSION
+
+def _remember_analysis(ctx: Optional[Context], result: Dict[str, Any]):
+    """Store the latest analysis for the caller's session"""
+    _SESSION_ANALYSES[_session_key(ctx)] = result
 
 @mcp.tool(description="Analyze source code and extract metadata for test generation")  
 async def analyze_code(file_name: str, language: str, ctx: Context = None) -> str:  
@@ -160,23 +241,19 @@ async def analyze_code(file_name: str, language: str, ctx: Context = None) -> st
         file_name: Name of the file to analyze 
         language: Programming language (python, java, javascript)  
     """  
-    global analysis
-    if language not in ["python", "java", "javascript"]:  
+    if language not in _SUPPORTED_LANGUAGES:  
         raise ValueError(f"Unsupported language: {language}")  
       
     try:  
         if ctx:  
             await ctx.info(f"Analyzing {language} code at {file_name}")  
           
-        from src.parsers.code_analyzer import CodeAnalyzer  
-        analyzer = CodeAnalyzer()  
-        result = analyzer.analyze("src_folder/"+ file_name, language)  
-        analysis = result
+        result = await asyncio.to_thread(analyze_file, "src_folder/"+ file_name, language)  
+        _remember_analysis(ctx, result)
         if ctx:  
             await ctx.info("Code analysis completed successfully")  
           
-        import json  
-        return json.dumps(result, indent=2)  
+        return encode_result(result)  
     except Exception as e:  
         logger.error(f"Error analyzing code: {e}")  
         if ctx:  
@@ -198,9 +275,10 @@ async def generate_tests(
         test_framework: Testing framework to use (pytest, junit, jest, etc.)  
         coverage_target: Target code coverage percentage (0-100)  
     """  
-    global analysis
-    if code_analysis == None:
-        code_analysis = analysis
+    if code_analysis is None:
+        code_analysis = _SESSION_ANALYSES.get(_session_key(ctx))
+        if code_analysis is None:
+            raise ValueError("No code analysis available: call analyze_code first or pass code_analysis")
     if coverage_target < 0 or coverage_target > 100:  
         raise ValueError("Coverage target must be between 0 and 100")  
       
@@ -209,16 +287,14 @@ async def generate_tests(
             await ctx.info(f"Generating tests with {coverage_target}% coverage target")  
             await ctx.report_progress(0, 100, "Starting test generation")  
           
-        from src.generators.test_generator import TestGenerator  
-        generator = TestGenerator()  
-        result = generator.generate(code_analysis, test_framework, coverage_target)  
+        generator = get_backend('generator')  
+        result = await asyncio.to_thread(generator.generate, code_analysis, test_framework, coverage_target)  
           
         if ctx:  
             await ctx.report_progress(100, 100, "Test generation complete")  
             await ctx.info("Test generation completed successfully")  
           
-        import json  
-        return json.dumps(result, indent=2)  
+        return encode_result(result)  
     except Exception as e:  
         logger.error(f"Error generating tests: {e}")  
         if ctx:  
@@ -239,16 +315,15 @@ async def build_and_validate(test_files: list[str], project_path: str, ctx: Cont
             await ctx.info(f"Validating {len(test_files)} test files")  
             await ctx.report_progress(0, len(test_files), "Starting validation")  
           
-        from src.builders.test_builder import TestBuilder  
-        builder = TestBuilder()  
-        result = builder.build_and_validate(test_files, project_path)  
+        builder = get_backend('builder')  
+        # The files share one environment; the builder checks them concurrently inside it
+        result = await asyncio.to_thread(builder.build_and_validate, test_files, project_path)  
           
         if ctx:  
             await ctx.report_progress(len(test_files), len(test_files), "Validation complete")  
             await ctx.info("Test validation completed successfully")  
           
-        import json  
-        return json.dumps(result, indent=2)  
+        return encode_result(result)  
     except Exception as e:  
         logger.error(f"Error building/validating tests: {e}")  
         if ctx:  
@@ -272,37 +347,37 @@ async def configure_project(
         test_framework: Preferred testing framework  
         build_tool: Build tool used in the project (maven, gradle, npm, etc.)  
     """  
-    if language not in ["python", "java", "javascript"]:  
+    if language not in _SUPPORTED_LANGUAGES:  
         raise ValueError(f"Unsupported language: {language}")  
       
     try:  
         if ctx:  
             await ctx.info(f"Configuring {language} project at {project_path}")  
           
-        from src.config.project_config import ProjectConfig  
-        config = ProjectConfig()  
-        result = config.configure(project_path, language, test_framework, build_tool)  
+        config = get_backend('config')  
+        result = await asyncio.to_thread(config.configure, project_path, language, test_framework, build_tool)  
           
         if ctx:  
             await ctx.info("Project configuration completed successfully")  
           
-        import json  
-        return json.dumps(result, indent=2)  
+        return encode_result(result)  
     except Exception as e:  
         logger.error(f"Error configuring project: {e}")  
         if ctx:  
             await ctx.error(f"Project configuration failed: {e}")  
         raise  
   
+_HEALTH_PAYLOAD = encode_result({
+    'status': 'healthy',
+    'service': 'MCP Unit Test Generator Server',
+    'version': '1.0.0'
+})
+
 # Add a health check resource for monitoring  
 @mcp.resource("health://status")  
 async def health_status() -> str:  
     """Health check resource"""  
-    return json.dumps({  
-        'status': 'healthy',  
-        'service': 'MCP Unit Test Generator Server',  
-        'version': '1.0.0'  
-    })  
+    return _HEALTH_PAYLOAD
   
 if __name__ == '__main__':  
     logger.info("Starting MCP Unit Test Generator Server")  
@@ -2,34 +2,210 @@
 Code Analyzer using Tree-sitter for multi-language AST parsing
 """
 import os
+import ast
+import pickle
+import sqlite3
+import hashlib
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 import tree_sitter_python as tspython
 import tree_sitter_java as tsjava
 import tree_sitter_javascript as tsjavascript
-from tree_sitter import Language, Parser, Node
-from typing import Dict, List, Any, Optional
+from tree_sitter import Language, Parser, Node, Query, Tree
+from typing import Dict, List, Any, Optional, Callable, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Everything the analysis needs from the tree, matched natively by one query per
+# language: definitions to extract, and decision points for complexity
+_QUERY_SOURCES = {
+    'python': """
+        (function_definition) @function
+        (class_definition) @class
+        (import_statement) @import
+        (import_from_statement) @import
+        [(if_statement) (elif_clause) (while_statement) (for_statement)
+         (except_clause) (case_clause) (conditional_expression)
+         (boolean_operator)] @decision
+    """,
+    'java': """
+        (method_declaration) @function
+        (class_declaration) @class
+        (import_declaration) @import
+        [(if_statement) (while_statement) (for_statement) (enhanced_for_statement)
+         (switch_label) (catch_clause) (ternary_expression)] @decision
+        (binary_expression operator: ["&&" "||"]) @decision
+    """,
+    'javascript': """
+        (function_declaration) @function
+        (arrow_function) @function
+        (function_expression) @function
+        (method_definition) @method
+        (class_declaration) @class
+        (import_statement) @import
+        [(if_statement) (while_statement) (for_statement) (for_in_statement)
+         (switch_case) (catch_clause) (ternary_expression)] @decision
+        (binary_expression operator: ["&&" "||"]) @decision
+    """
+}
+
+# Compiled queries, shared by every analyzer instance
+_QUERIES: Dict[str, Query] = {}
+
+# Files past either limit only get their top-level definitions extracted
+_SHALLOW_THRESHOLD = 200_000  # bytes
+_SHALLOW_MAX_NODES = 100_000
+
+# Top-level node type -> capture name, for shallow analysis
+_TOP_LEVEL_TYPES = {
+    'python': {
+        'function_definition': 'function',
+        'class_definition': 'class',
+        'import_statement': 'import',
+        'import_from_statement': 'import'
+    },
+    'java': {
+        'class_declaration': 'class',
+        'import_declaration': 'import'
+    },
+    'javascript': {
+        'function_declaration': 'function',
+        'class_declaration': 'class',
+        'import_statement': 'import'
+    }
+}
+
+# Wrapper node type -> field holding the wrapped definition
+_WRAPPER_FIELDS = {'decorated_definition': 'definition', 'export_statement': 'declaration'}
+
+# Syntax trees kept for incremental re-parsing, most recently used last
+_MAX_RETAINED_TREES = 32
+
+# Capture name -> analysis result key
+_CAPTURE_KEYS = (('function', 'functions'), ('class', 'classes'), ('import', 'imports'))
+
+# Persistent analysis cache; bump the version whenever the result format changes
+_CACHE_PATH = Path(
+    os.getenv('UTCODEASSIST_CACHE_DIR', Path.home() / '.cache' / 'utcodeassist')
+) / 'analysis.sqlite3'
+_CACHE_VERSION = b'7'
+
+# Analyzer owned by each analyze_many_parallel worker process
+_WORKER_ANALYZER = None
+
+def _init_worker(cache_path: str):
+    """Build the worker process's analyzer once, before it takes any files"""
+    global _WORKER_ANALYZER
+    _WORKER_ANALYZER = CodeAnalyzer(cache_path)
+
+def _analyze_in_worker(file_path: str, language: str) -> Dict[str, Any]:
+    return _WORKER_ANALYZER.analyze(file_path, language)
+
+def _kind_table(language: Language, by_type: Dict[str, Any]) -> Dict[int, Any]:
+    """Re-key a node type -> value map by kind id, covering every id (aliases included) of each type"""
+    return {
+        kind_id: by_type[language.node_kind_for_id(kind_id)]
+        for kind_id in range(language.node_kind_count)
+        if language.node_kind_is_named(kind_id) and language.node_kind_for_id(kind_id) in by_type
+    }
+
+def _match_length(limit: int, matches: Callable[[int, int], bool]) -> int:
+    """
+    Largest n <= limit such that units [0, n) match, where matches(lo, hi)
+    compares units [lo, hi). Binary search; each step compares only the part
+    not already known to match.
+    """
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if matches(lo, mid):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def _point(data: bytes, offset: int) -> Tuple[int, int]:
+    """Row and byte column of an offset"""
+    return data.count(b'\n', 0, offset), offset - (data.rfind(b'\n', 0, offset) + 1)
+
+def _edit_tree(tree: Tree, old: bytes, new: bytes):
+    """Describe to a tree the single span where its old source and the new source differ"""
+    old_view, new_view = memoryview(old), memoryview(new)
+    start = _match_length(min(len(old), len(new)),
+                          lambda lo, hi: old_view[lo:hi] == new_view[lo:hi])
+    # The common suffix must not overlap the common prefix
+    suffix = _match_length(min(len(old), len(new)) - start,
+                           lambda lo, hi: old_view[len(old) - hi:len(old) - lo] == new_view[len(new) - hi:len(new) - lo])
+    old_end, new_end = len(old) - suffix, len(new) - suffix
+    tree.edit(
+        start_byte=start,
+        old_end_byte=old_end,
+        new_end_byte=new_end,
+        start_point=_point(old, start),
+        old_end_point=_point(old, old_end),
+        new_end_point=_point(new, new_end)
+    )
+
+def _preorder_key(node: Node):
+    """Sort key placing enclosing nodes before the nodes they contain"""
+    return (node.start_byte, -node.end_byte)
+
 class CodeAnalyzer:
     """Multi-language code analyzer using Tree-sitter"""
     
-    def __init__(self):
+    def __init__(self, cache_path: Optional[str] = None):
         self.languages = {
             'python': Language(tspython.language()),
             'java': Language(tsjava.language()),
             'javascript': Language(tsjavascript.language())
         }
         self.parsers = {}
+        self.queries = {}
+        self.top_level_kinds = {}
+        self.wrapper_kinds = {}
         self._init_parsers()
+        self.extractors = {
+            'python': {
+                'function': self._extract_python_function,
+                'class': self._extract_python_class,
+                'import': self._extract_python_import
+            },
+            'java': {
+                'function': self._extract_java_method,
+                'class': self._extract_java_class,
+                'import': self._extract_java_import
+            },
+            'javascript': {
+                'function': self._extract_js_function,
+                'class': self._extract_js_class,
+                'import': self._extract_js_import
+            }
+        }
+        self.cache_path = Path(cache_path) if cache_path else _CACHE_PATH
+        self._cache = None
+        self._cache_pid = None
+        self._cache_lock = threading.Lock()
+        self._trees = OrderedDict()  # (path, language) -> (tree, source bytes)
+        self._trees_lock = threading.Lock()
     
     def _init_parsers(self):
-        """Initialize parsers for each language"""
+        """Initialize parsers and compiled queries for each language"""
         for lang_name, language in self.languages.items():
             parser = Parser(language)
             self.parsers[lang_name] = parser
+            if lang_name not in _QUERIES:
+                _QUERIES[lang_name] = language.query(_QUERY_SOURCES[lang_name])
+            self.queries[lang_name] = _QUERIES[lang_name]
+            # Integer kind ids let shallow analysis skip string compares per top-level node
+            self.top_level_kinds[lang_name] = _kind_table(language, _TOP_LEVEL_TYPES[lang_name])
+            self.wrapper_kinds[lang_name] = _kind_table(language, _WRAPPER_FIELDS)
     
-    def analyze(self, file_path: str, language: str) -> Dict[str, Any]:
+    def analyze(self, file_path: str, language: str,
+                shallow_threshold: int = _SHALLOW_THRESHOLD) -> Dict[str, Any]:
         """Analyze source code file and extract metadata"""
         if language not in self.languages:
             raise ValueError(f"Unsupported language: {language}")
@@ -37,11 +213,96 @@ class CodeAnalyzer:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            source_code = f.read()
+        with open(file_path, 'rb') as f:
+            data = f.read()
         
-        parser = self.parsers[language]
-        tree = parser.parse(bytes(source_code, 'utf8'))
+        return self._analyze_source(file_path, language, data, shallow_threshold)
+    
+    def analyze_incremental(self, file_path: str, language: str,
+                            shallow_threshold: int = _SHALLOW_THRESHOLD) -> Dict[str, Any]:
+        """
+        Analyze a file that is expected to be re-analyzed after small edits.
+        
+        The syntax tree is kept after parsing. When the file changes, the
+        changed span is found by comparing old and new contents, the old tree
+        is edited to match, and tree-sitter re-parses only what the edit
+        touched.
+        """
+        if language not in self.languages:
+            raise ValueError(f"Unsupported language: {language}")
+        
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        
+        return self._analyze_source(file_path, language, data, shallow_threshold, incremental=True)
+    
+    def analyze_many(self, file_paths: List[str], language: str,
+                     shallow_threshold: int = _SHALLOW_THRESHOLD) -> Dict[str, Dict[str, Any]]:
+        """Analyze several files of one language with the shared parser"""
+        if language not in self.languages:
+            raise ValueError(f"Unsupported language: {language}")
+        
+        results = {}
+        for file_path in file_paths:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            results[file_path] = self._analyze_source(file_path, language, data, shallow_threshold)
+        
+        return results
+    
+    def analyze_many_parallel(self, paths_by_lang: Dict[str, List[str]],
+                              workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze files of several languages across worker processes.
+        
+        Parsing and extraction are CPU-bound and hold the GIL, so each worker
+        process owns its own analyzer. Returns results keyed by file path.
+        """
+        for language in paths_by_lang:
+            if language not in self.languages:
+                raise ValueError(f"Unsupported language: {language}")
+        
+        jobs = [(path, language) for language, paths in paths_by_lang.items() for path in paths]
+        workers = min(workers or os.cpu_count() or 1, len(jobs))
+        if workers <= 1:
+            return {path: self.analyze(path, language) for path, language in jobs}
+        
+        paths, languages = zip(*jobs)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(str(self.cache_path),)) as executor:
+            results = executor.map(_analyze_in_worker, paths, languages,
+                                   chunksize=max(1, len(jobs) // (workers * 4)))
+            return dict(zip(paths, results))
+    
+    def _analyze_source(self, file_path: str, language: str, data: bytes,
+                        shallow_threshold: int = _SHALLOW_THRESHOLD,
+                        incremental: bool = False) -> Dict[str, Any]:
+        """Analyze the raw bytes of a source file"""
+        # Results are keyed by path and content, so unchanged files skip parsing entirely
+        hasher = hashlib.sha256(b'%s\0%d\0' % (_CACHE_VERSION, shallow_threshold))
+        hasher.update(data)
+        digest = hasher.hexdigest()
+        
+        source_code = str(data, 'utf-8')
+        source_bytes = data
+        if '\r' in source_code:
+            # Match text-mode reads: universal newlines
+            source_code = source_code.replace('\r\n', '\n').replace('\r', '\n')
+            source_bytes = source_code.encode('utf8')
+        
+        cached = self._cache_load(file_path, language, digest)
+        if cached is not None:
+            cached['file_path'] = file_path
+            cached['source_code'] = source_code
+            return cached
+        
+        if incremental:
+            tree = self._parse_incremental(file_path, language, source_bytes)
+        else:
+            tree = self.parsers[language].parse(source_bytes)
         
         analysis_result = {
             'file_path': file_path,
@@ -52,401 +313,407 @@ class CodeAnalyzer:
             'imports': [],
             'dependencies': [],
             'complexity_score': 0,
-            'lines_of_code': len(source_code.split('\n')),
+            'lines_of_code': source_code.count('\n') + 1,
             'ast_tree': None  # We'll store simplified AST info
         }
         
-        # Extract different elements based on language
-        if language == 'python':
-            self._analyze_python(tree.root_node, analysis_result, source_code)
-        elif language == 'java':
-            self._analyze_java(tree.root_node, analysis_result, source_code)
-        elif language == 'javascript':
-            self._analyze_javascript(tree.root_node, analysis_result, source_code)
+        if len(source_bytes) > shallow_threshold or tree.root_node.descendant_count > _SHALLOW_MAX_NODES:
+            logger.warning(f"{file_path} is too large for full analysis; extracting top-level definitions only")
+            captures = self._top_level_definitions(tree.root_node, language)
+            # Counting decision points would visit the whole file again; every
+            # function reports the base complexity
+            complexities = defaultdict(lambda: 1)
+        else:
+            # Match every definition and decision point in one native query pass, and
+            # count each function's decision points without visiting nodes in Python
+            captures = self.queries[language].captures(tree.root_node)
+            complexities = self._function_complexities(
+                captures.get('function', []) + captures.get('method', []),
+                captures.get('decision', [])
+            )
+        
+        extractors = self.extractors[language]
+        for capture_name, result_key in _CAPTURE_KEYS:
+            extract = extractors[capture_name]
+            # Captures are not guaranteed in source order; restore pre-order
+            nodes = sorted(captures.get(capture_name, ()), key=_preorder_key)
+            analysis_result[result_key] = [extract(node, source_bytes, complexities) for node in nodes]
         
         # Calculate complexity score
         analysis_result['complexity_score'] = self._calculate_complexity(analysis_result)
         
+        self._cache_store(file_path, language, digest, analysis_result)
         return analysis_result
     
-    def _analyze_python(self, root_node: Node, result: Dict[str, Any], source_code: str):
-        """Analyze Python-specific constructs"""
-        lines = source_code.split('\n')
-        
-        def traverse(node: Node):
-            if node.type == 'function_definition':
-                func_info = self._extract_python_function(node, lines)
-                result['functions'].append(func_info)
-            
-            elif node.type == 'class_definition':
-                class_info = self._extract_python_class(node, lines)
-                result['classes'].append(class_info)
-            
-            elif node.type == 'import_statement' or node.type == 'import_from_statement':
-                import_info = self._extract_python_import(node, lines)
-                result['imports'].append(import_info)
-            
-            for child in node.children:
-                traverse(child)
-        
-        traverse(root_node)
-    
-    def _analyze_java(self, root_node: Node, result: Dict[str, Any], source_code: str):
-        """Analyze Java-specific constructs"""
-        lines = source_code.split('\n')
-        
-        def traverse(node: Node):
-            if node.type == 'method_declaration':
-                func_info = self._extract_java_method(node, lines)
-                result['functions'].append(func_info)
-            
-            elif node.type == 'class_declaration':
-                class_info = self._extract_java_class(node, lines)
-                result['classes'].append(class_info)
-            
-            elif node.type == 'import_declaration':
-                import_info = self._extract_java_import(node, lines)
-                result['imports'].append(import_info)
-            
-            for child in node.children:
-                traverse(child)
-        
-        traverse(root_node)
-    
-    def _analyze_javascript(self, root_node: Node, result: Dict[str, Any], source_code: str):
-        """Analyze JavaScript-specific constructs"""
-        lines = source_code.split('\n')
-        
-        def traverse(node: Node):
-            if node.type in ['function_declaration', 'arrow_function', 'function_expression']:
-                func_info = self._extract_js_function(node, lines)
-                result['functions'].append(func_info)
-            
-            elif node.type == 'class_declaration':
-                class_info = self._extract_js_class(node, lines)
-                result['classes'].append(class_info)
-            
-            elif node.type == 'import_statement':
-                import_info = self._extract_js_import(node, lines)
-                result['imports'].append(import_info)
-            
-            for child in node.children:
-                traverse(child)
-        
-        traverse(root_node)
-    
-    def _extract_python_function(self, node: Node, lines: List[str]) -> Dict[str, Any]:
+    def _parse_incremental(self, file_path: str, language: str, source_bytes: bytes) -> Tree:
+        """Parse reusing the file's previous tree, and retain the new one"""
+        key = (os.path.abspath(file_path), language)
+        # Trees are edited in place, so each one is taken out while in use
+        with self._trees_lock:
+            previous = self._trees.pop(key, None)
+        
+        parser = self.parsers[language]
+        if previous is None:
+            tree = parser.parse(source_bytes)
+        else:
+            old_tree, old_bytes = previous
+            _edit_tree(old_tree, old_bytes, source_bytes)
+            tree = parser.parse(source_bytes, old_tree)
+        
+        with self._trees_lock:
+            self._trees[key] = (tree, source_bytes)
+            while len(self._trees) > _MAX_RETAINED_TREES:
+                self._trees.popitem(last=False)
+        return tree
+    
+    def invalidate(self, file_path: str):
+        """Drop cached analyses of a file, e.g. when a watcher reports it changed"""
+        with self._cache_lock:
+            conn = self._cache_connection()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute('DELETE FROM ast_cache WHERE path = ?', (os.path.abspath(file_path),))
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to invalidate analysis cache: {e}")
+    
+    def _cache_connection(self) -> Optional[sqlite3.Connection]:
+        """Open the cache database, once per process; None if it is unavailable"""
+        # Forked workers must not share the parent's connection
+        if self._cache_pid != os.getpid():
+            self._cache_pid = os.getpid()
+            self._cache = None
+            try:
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.cache_path), timeout=30, check_same_thread=False)
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS ast_cache ('
+                    'path TEXT, language TEXT, sha TEXT, blob BLOB, '
+                    'PRIMARY KEY(path, language, sha))'
+                )
+                self._cache = conn
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Analysis cache disabled: {e}")
+        return self._cache
+    
+    def _cache_load(self, file_path: str, language: str, digest: str) -> Optional[Dict[str, Any]]:
+        """Return the cached analysis for this exact file content, if any"""
+        with self._cache_lock:
+            conn = self._cache_connection()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    'SELECT blob FROM ast_cache WHERE path = ? AND language = ? AND sha = ?',
+                    (os.path.abspath(file_path), language, digest)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to read analysis cache: {e}")
+                return None
+        if row is None:
+            return None
+        try:
+            return pickle.loads(row[0])
+        except Exception as e:
+            logger.warning(f"Discarding corrupt analysis cache entry: {e}")
+            return None
+    
+    def _cache_store(self, file_path: str, language: str, digest: str, result: Dict[str, Any]):
+        """Cache an analysis, replacing entries for older versions of the file"""
+        # The source is re-read for hashing on every lookup, so it is not stored twice
+        blob = pickle.dumps({**result, 'source_code': None}, protocol=pickle.HIGHEST_PROTOCOL)
+        path = os.path.abspath(file_path)
+        with self._cache_lock:
+            conn = self._cache_connection()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute('DELETE FROM ast_cache WHERE path = ? AND language = ?', (path, language))
+                    conn.execute(
+                        'INSERT OR REPLACE INTO ast_cache (path, language, sha, blob) VALUES (?, ?, ?, ?)',
+                        (path, language, digest, blob)
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to write analysis cache: {e}")
+    
+    def _extract_python_function(self, node: Node, source_bytes: bytes, complexities: Dict[int, int]) -> Dict[str, Any]:
         """Extract Python function information"""
-        func_name = ""
         parameters = []
         return_type = None
         docstring = ""
         
-        for child in node.children:
-            if child.type == 'identifier':
-                func_name = self._get_node_text(child, lines)
-            elif child.type == 'parameters':
-                parameters = self._extract_python_parameters(child, lines)
-            elif child.type == 'block':
-                # Look for docstring in the first statement
-                for stmt in child.children:
-                    if stmt.type == 'expression_statement':
-                        for expr_child in stmt.children:
-                            if expr_child.type == 'string':
-                                docstring = self._get_node_text(expr_child, lines).strip('"\'')
-                                break
-                        break
+        params_node = node.child_by_field_name('parameters')
+        if params_node:
+            parameters = self._extract_python_parameters(params_node, source_bytes)
+        
+        # The docstring is a string literal as the first statement of the body
+        body_node = node.child_by_field_name('body')
+        first_stmt = body_node.named_child(0) if body_node and body_node.named_child_count else None
+        if first_stmt and first_stmt.type == 'expression_statement':
+            expr = first_stmt.named_child(0)
+            if expr and expr.type == 'string':
+                docstring = self._python_string_value(self._get_node_text(expr, source_bytes))
         
         return {
-            'name': func_name,
+            'name': self._get_field_text(node, 'name', source_bytes),
             'parameters': parameters,
             'return_type': return_type,
             'docstring': docstring,
             'start_line': node.start_point[0] + 1,
             'end_line': node.end_point[0] + 1,
-            'complexity': self._calculate_function_complexity(node)
+            'complexity': complexities[node.id]
         }
     
-    def _extract_python_class(self, node: Node, lines: List[str]) -> Dict[str, Any]:
+    def _extract_python_class(self, node: Node, source_bytes: bytes, complexities: Dict[int, int]) -> Dict[str, Any]:
         """Extract Python class information"""
-        class_name = ""
         methods = []
         base_classes = []
         
-        for child in node.children:
-            if child.type == 'identifier':
-                class_name = self._get_node_text(child, lines)
-            elif child.type == 'argument_list':
-                # Extract base classes
-                for arg in child.children:
-                    if arg.type == 'identifier':
-                        base_classes.append(self._get_node_text(arg, lines))
-            elif child.type == 'block':
-                # Extract methods
-                for stmt in child.children:
-                    if stmt.type == 'function_definition':
-                        method_info = self._extract_python_function(stmt, lines)
-                        methods.append(method_info)
+        superclasses = node.child_by_field_name('superclasses')
+        if superclasses:
+            for arg in superclasses.named_children:
+                if arg.type == 'identifier':
+                    base_classes.append(self._get_node_text(arg, source_bytes))
+        
+        body_node = node.child_by_field_name('body')
+        if body_node:
+            for stmt in body_node.named_children:
+                if stmt.type == 'function_definition':
+                    methods.append(self._extract_python_function(stmt, source_bytes, complexities))
         
         return {
-            'name': class_name,
+            'name': self._get_field_text(node, 'name', source_bytes),
             'base_classes': base_classes,
             'methods': methods,
             'start_line': node.start_point[0] + 1,
             'end_line': node.end_point[0] + 1
         }
     
-    def _extract_python_import(self, node: Node, lines: List[str]) -> Dict[str, Any]:
+    def _extract_python_import(self, node: Node, source_bytes: bytes, complexities: Dict[int, int]) -> Dict[str, Any]:
         """Extract Python import information"""
-        import_text = self._get_node_text(node, lines)
+        import_text = self._get_node_text(node, source_bytes)
         return {
             'type': node.type,
             'text': import_text,
             'line': node.start_point[0] + 1
         }
     
-    def _extract_python_parameters(self, node: Node, lines: List[str]) -> List[Dict[str, Any]]:
+    def _extract_python_parameters(self, node: Node, source_bytes: bytes) -> List[Dict[str, Any]]:
         """Extract Python function parameters"""
         parameters = []
         
-        for child in node.children:
+        for child in node.named_children:
             if child.type == 'identifier':
-                param_name = self._get_node_text(child, lines)
                 parameters.append({
-                    'name': param_name,
+                    'name': self._get_node_text(child, source_bytes),
                     'type': None,  # Python doesn't always have type hints
                     'default': None
                 })
             elif child.type == 'typed_parameter':
-                # Handle typed parameters
-                param_info = {'name': '', 'type': None, 'default': None}
-                for param_child in child.children:
-                    if param_child.type == 'identifier':
-                        param_info['name'] = self._get_node_text(param_child, lines)
-                    elif param_child.type == 'type':
-                        param_info['type'] = self._get_node_text(param_child, lines)
-                parameters.append(param_info)
+                # The name is the parameter's only identifier child; the hint is its 'type' field
+                name = next((c for c in child.named_children if c.type == 'identifier'), None)
+                parameters.append({
+                    'name': self._get_node_text(name, source_bytes) if name else '',
+                    'type': self._get_field_text(child, 'type', source_bytes, None),
+                    'default': None
+                })
         
         return parameters
     
-    def _extract_java_method(self, node: Node, lines: List[str]) -> Dict[str, Any]:
+    def _extract_java_method(self, node: Node, source_bytes: bytes, complexities: Dict[int, int]) -> Dict[str, Any]:
         """Extract Java method information"""
-        method_name = ""
-        parameters = []
-        return_type = ""
-        modifiers = []
-        
-        for child in node.children:
-            if child.type == 'identifier':
-                method_name = self._get_node_text(child, lines)
-            elif child.type == 'formal_parameters':
-                parameters = self._extract_java_parameters(child, lines)
-            elif child.type in ['void_type', 'type_identifier', 'generic_type']:
-                return_type = self._get_node_text(child, lines)
-            elif child.type == 'modifiers':
-                for mod_child in child.children:
-                    modifiers.append(self._get_node_text(mod_child, lines))
+        params_node = node.child_by_field_name('parameters')
         
         return {
-            'name': method_name,
-            'parameters': parameters,
-            'return_type': return_type,
-            'modifiers': modifiers,
+            'name': self._get_field_text(node, 'name', source_bytes),
+            'parameters': self._extract_java_parameters(params_node, source_bytes) if params_node else [],
+            'return_type': self._get_field_text(node, 'type', source_bytes),
+            'modifiers': self._extract_java_modifiers(node, source_bytes),
             'start_line': node.start_point[0] + 1,
             'end_line': node.end_point[0] + 1,
-            'complexity': self._calculate_function_complexity(node)
+            'complexity': complexities[node.id]
         }
     
-    def _extract_java_class(self, node: Node, lines: List[str]) -> Dict[str, Any]:
+    def _extract_java_class(self, node: Node, source_bytes: bytes, complexities: Dict[int, int]) -> Dict[str, Any]:
         """Extract Java class information"""
-        class_name = ""
         methods = []
         fields = []
-        modifiers = []
         
-        for child in node.children:
-            if child.type == 'identifier':
-                class_name = self._get_node_text(child, lines)
-            elif child.type == 'modifiers':
-                for mod_child in child.children:
-                    modifiers.append(self._get_node_text(mod_child, lines))
-            elif child.type == 'class_body':
-                for body_child in child.children:
-                    if body_child.type == 'method_declaration':
-                        method_info = self._extract_java_method(body_child, lines)
-                        methods.append(method_info)
-                    elif body_child.type == 'field_declaration':
-                        field_info = self._extract_java_field(body_child, lines)
-                        fields.append(field_info)
+        body_node = node.child_by_field_name('body')
+        if body_node:
+            for body_child in body_node.named_children:
+                if body_child.type == 'method_declaration':
+                    methods.append(self._extract_java_method(body_child, source_bytes, complexities))
+                elif body_child.type == 'field_declaration':
+                    fields.append(self._extract_java_field(body_child, source_bytes))
         
         return {
-            'name': class_name,
-            'modifiers': modifiers,
+            'name': self._get_field_text(node, 'name', source_bytes),
+            'modifiers': self._extract_java_modifiers(node, source_bytes),
             'methods': methods,
             'fields': fields,
             'start_line': node.start_point[0] + 1,
             'end_line': node.end_point[0] + 1
         }
     
-    def _extract_java_parameters(self, node: Node, lines: List[str]) -> List[Dict[str, Any]]:
+    def _extract_java_parameters(self, node: Node, source_bytes: bytes) -> List[Dict[str, Any]]:
         """Extract Java method parameters"""
         parameters = []
         
-        for child in node.children:
+        for child in node.named_children:
             if child.type == 'formal_parameter':
-                param_info = {'name': '', 'type': '', 'modifiers': []}
-                for param_child in child.children:
-                    if param_child.type == 'identifier':
-                        param_info['name'] = self._get_node_text(param_child, lines)
-                    elif param_child.type in ['type_identifier', 'generic_type']:
-                        param_info['type'] = self._get_node_text(param_child, lines)
-                    elif param_child.type == 'modifiers':
-                        for mod in param_child.children:
-                            param_info['modifiers'].append(self._get_node_text(mod, lines))
-                parameters.append(param_info)
+                parameters.append({
+                    'name': self._get_field_text(child, 'name', source_bytes),
+                    'type': self._get_field_text(child, 'type', source_bytes),
+                    'modifiers': self._extract_java_modifiers(child, source_bytes)
+                })
         
         return parameters
     
-    def _extract_java_field(self, node: Node, lines: List[str]) -> Dict[str, Any]:
+    def _extract_java_field(self, node: Node, source_bytes: bytes) -> Dict[str, Any]:
         """Extract Java field information"""
-        field_info = {'name': '', 'type': '', 'modifiers': []}
-        
-        for child in node.children:
-            if child.type == 'variable_declarator':
-                for var_child in child.children:
-                    if var_child.type == 'identifier':
-                        field_info['name'] = self._get_node_text(var_child, lines)
-            elif child.type in ['type_identifier', 'generic_type']:
-                field_info['type'] = self._get_node_text(child, lines)
-            elif child.type == 'modifiers':
-                for mod in child.children:
-                    field_info['modifiers'].append(self._get_node_text(mod, lines))
-        
-        return field_info
-    
-    def _extract_java_import(self, node: Node, lines: List[str]) -> Dict[str, Any]:
+        declarator = node.child_by_field_name('declarator')
+        return {
+            'name': self._get_field_text(declarator, 'name', source_bytes) if declarator else '',
+            'type': self._get_field_text(node, 'type', source_bytes),
+            'modifiers': self._extract_java_modifiers(node, source_bytes)
+        }
+    
+    def _extract_java_modifiers(self, node: Node, source_bytes: bytes) -> List[str]:
+        """Extract the modifiers of a Java declaration"""
+        # Keywords like 'public' are anonymous tokens, so all children are read here
+        for child in node.named_children:
+            if child.type == 'modifiers':
+                return [self._get_node_text(mod, source_bytes) for mod in child.children]
+        return []
+    
+    def _extract_java_import(self, node: Node, source_bytes: bytes, complexities: Dict[int, int]) -> Dict[str, Any]:
         """Extract Java import information"""
-        import_text = self._get_node_text(node, lines)
+        import_text = self._get_node_text(node, source_bytes)
         return {
             'type': 'import',
             'text': import_text,
             'line': node.start_point[0] + 1
         }
     
-    def _extract_js_function(self, node: Node, lines: List[str]) -> Dict[str, Any]:
+    def _extract_js_function(self, node: Node, source_bytes: bytes, complexities: Dict[int, int]) -> Dict[str, Any]:
         """Extract JavaScript function information"""
-        func_name = ""
-        parameters = []
-        
-        for child in node.children:
-            if child.type == 'identifier':
-                func_name = self._get_node_text(child, lines)
-            elif child.type == 'formal_parameters':
-                parameters = self._extract_js_parameters(child, lines)
-        
         return {
-            'name': func_name or 'anonymous',
-            'parameters': parameters,
+            'name': self._get_field_text(node, 'name', source_bytes) or 'anonymous',
+            'parameters': self._extract_js_function_parameters(node, source_bytes),
             'start_line': node.start_point[0] + 1,
             'end_line': node.end_point[0] + 1,
-            'complexity': self._calculate_function_complexity(node)
+            'complexity': complexities[node.id]
         }
     
-    def _extract_js_class(self, node: Node, lines: List[str]) -> Dict[str, Any]:
+    def _extract_js_class(self, node: Node, source_bytes: bytes, complexities: Dict[int, int]) -> Dict[str, Any]:
         """Extract JavaScript class information"""
-        class_name = ""
         methods = []
         
-        for child in node.children:
-            if child.type == 'identifier':
-                class_name = self._get_node_text(child, lines)
-            elif child.type == 'class_body':
-                for body_child in child.children:
-                    if body_child.type == 'method_definition':
-                        method_info = self._extract_js_method(body_child, lines)
-                        methods.append(method_info)
+        body_node = node.child_by_field_name('body')
+        if body_node:
+            for body_child in body_node.named_children:
+                if body_child.type == 'method_definition':
+                    methods.append(self._extract_js_method(body_child, source_bytes, complexities))
         
         return {
-            'name': class_name,
+            'name': self._get_field_text(node, 'name', source_bytes),
             'methods': methods,
             'start_line': node.start_point[0] + 1,
             'end_line': node.end_point[0] + 1
         }
     
-    def _extract_js_method(self, node: Node, lines: List[str]) -> Dict[str, Any]:
+    def _extract_js_method(self, node: Node, source_bytes: bytes, complexities: Dict[int, int]) -> Dict[str, Any]:
         """Extract JavaScript method information"""
-        method_name = ""
-        parameters = []
-        
-        for child in node.children:
-            if child.type == 'property_identifier':
-                method_name = self._get_node_text(child, lines)
-            elif child.type == 'formal_parameters':
-                parameters = self._extract_js_parameters(child, lines)
-        
         return {
-            'name': method_name,
-            'parameters': parameters,
+            'name': self._get_field_text(node, 'name', source_bytes),
+            'parameters': self._extract_js_function_parameters(node, source_bytes),
             'start_line': node.start_point[0] + 1,
             'end_line': node.end_point[0] + 1,
-            'complexity': self._calculate_function_complexity(node)
+            'complexity': complexities[node.id]
         }
     
-    def _extract_js_parameters(self, node: Node, lines: List[str]) -> List[Dict[str, Any]]:
+    def _extract_js_function_parameters(self, node: Node, source_bytes: bytes) -> List[Dict[str, Any]]:
+        """Extract the parameters of a JavaScript function, arrow function or method"""
+        params_node = node.child_by_field_name('parameters')
+        if params_node:
+            return self._extract_js_parameters(params_node, source_bytes)
+        # Arrow functions with a single unparenthesized parameter
+        param = node.child_by_field_name('parameter')
+        if param and param.type == 'identifier':
+            return [{'name': self._get_node_text(param, source_bytes), 'type': None, 'default': None}]
+        return []
+    
+    def _extract_js_parameters(self, node: Node, source_bytes: bytes) -> List[Dict[str, Any]]:
         """Extract JavaScript function parameters"""
         parameters = []
         
-        for child in node.children:
+        for child in node.named_children:
             if child.type == 'identifier':
-                param_name = self._get_node_text(child, lines)
                 parameters.append({
-                    'name': param_name,
+                    'name': self._get_node_text(child, source_bytes),
                     'type': None,  # JavaScript doesn't have static types
                     'default': None
                 })
         
         return parameters
     
-    def _extract_js_import(self, node: Node, lines: List[str]) -> Dict[str, Any]:
+    def _extract_js_import(self, node: Node, source_bytes: bytes, complexities: Dict[int, int]) -> Dict[str, Any]:
         """Extract JavaScript import information"""
-        import_text = self._get_node_text(node, lines)
+        import_text = self._get_node_text(node, source_bytes)
         return {
             'type': 'import',
             'text': import_text,
             'line': node.start_point[0] + 1
         }
     
-    def _get_node_text(self, node: Node, lines: List[str]) -> str:
+    def _get_field_text(self, node: Node, field_name: str, source_bytes: bytes,
+                        default: Optional[str] = '') -> Optional[str]:
+        """Extract the text of a node's field, or a default if the field is absent"""
+        child = node.child_by_field_name(field_name)
+        return self._get_node_text(child, source_bytes) if child else default
+    
+    def _get_node_text(self, node: Node, source_bytes: bytes) -> str:
         """Extract text content from a node"""
-        start_row, start_col = node.start_point
-        end_row, end_col = node.end_point
-        
-        if start_row == end_row:
-            return lines[start_row][start_col:end_col]
-        else:
-            result = lines[start_row][start_col:]
-            for row in range(start_row + 1, end_row):
-                result += '\n' + lines[row]
-            result += '\n' + lines[end_row][:end_col]
-            return result
-    
-    def _calculate_function_complexity(self, node: Node) -> int:
-        """Calculate cyclomatic complexity of a function"""
-        complexity = 1  # Base complexity
-        
-        def traverse(n: Node):
-            nonlocal complexity
-            # Count decision points
-            if n.type in ['if_statement', 'while_statement', 'for_statement', 
-                         'switch_statement', 'case_clause', 'catch_clause',
-                         'conditional_expression', 'logical_and', 'logical_or']:
-                complexity += 1
-            
-            for child in n.children:
-                traverse(child)
-        
-        traverse(node)
-        return complexity
+        return source_bytes[node.start_byte:node.end_byte].decode('utf8')
+    
+    def _top_level_definitions(self, root_node: Node, language: str) -> Dict[str, List[Node]]:
+        """Collect the file's top-level definitions by capture name, without descending further"""
+        top_level_kinds = self.top_level_kinds[language]
+        wrapper_kinds = self.wrapper_kinds[language]
+        definitions = {}
+        
+        for node in root_node.named_children:
+            field_name = wrapper_kinds.get(node.kind_id)
+            if field_name:
+                node = node.child_by_field_name(field_name) or node
+            capture_name = top_level_kinds.get(node.kind_id)
+            if capture_name:
+                definitions.setdefault(capture_name, []).append(node)
+        
+        return definitions
+    
+    def _python_string_value(self, literal: str) -> str:
+        """Evaluate a Python string literal, handling triple quotes, prefixes and escapes"""
+        try:
+            value = ast.literal_eval(literal)
+        except (ValueError, SyntaxError):
+            value = None
+        # f-strings and bytes literals have no plain string value; just trim the quotes
+        return value if isinstance(value, str) else literal.lstrip('rRbBfFuU').strip('"\'')
+    
+    def _function_complexities(self, function_nodes: List[Node], decision_nodes: List[Node]) -> Dict[int, int]:
+        """Calculate the cyclomatic complexity of every function from the captured decision points"""
+        # A function's decision points are those starting strictly inside it,
+        # including any in nested functions
+        decision_starts = sorted(node.start_byte for node in decision_nodes)
+        return {
+            node.id: 1 + bisect_left(decision_starts, node.end_byte) - bisect_right(decision_starts, node.start_byte)
+            for node in function_nodes
+        }
     
     def _calculate_complexity(self, analysis_result: Dict[str, Any]) -> int:
         """Calculate overall complexity score"""
@@ -6,21 +6,42 @@ import json
 import tempfile
 import os
 from pathlib import Path
+from unittest import mock
 
 # Add src to path
 import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+
+# The analysis and LLM caches resolve their directory at import time, so point
+# them at a throwaway directory before the modules below are loaded
+_CACHE_DIR = tempfile.TemporaryDirectory()
+_PREVIOUS_CACHE_DIR = os.environ.get('UTCODEASSIST_CACHE_DIR')
+os.environ['UTCODEASSIST_CACHE_DIR'] = _CACHE_DIR.name
 
 from parsers.code_analyzer import CodeAnalyzer
-from generators.test_generator import TestGenerator
+from generators.test_generator import TestGenerator, _rename
 from builders.test_builder import TestBuilder
 from config.project_config import ProjectConfig
+from src.mcp.server import MCPServer
+
+# Languages and parsers are built once for the whole module, not per test
+_ANALYZER = CodeAnalyzer(cache_path=os.path.join(_CACHE_DIR.name, 'analysis.sqlite3'))
+
+
+def tearDownModule():
+    # Restore only our own variable; the runner may have changed others since import
+    if _PREVIOUS_CACHE_DIR is None:
+        os.environ.pop('UTCODEASSIST_CACHE_DIR', None)
+    else:
+        os.environ['UTCODEASSIST_CACHE_DIR'] = _PREVIOUS_CACHE_DIR
+    _CACHE_DIR.cleanup()
 
 class TestCodeAnalyzer(unittest.TestCase):
     """Test the CodeAnalyzer class"""
     
     def setUp(self):
-        self.analyzer = CodeAnalyzer()
+        self.analyzer = _ANALYZER
         self.test_files_dir = Path(__file__).parent.parent / 'examples'
     
     def test_analyze_python_file(self):
@@ -79,13 +100,202 @@ class TestCodeAnalyzer(unittest.TestCase):
         if python_file.exists():
             with self.assertRaises(ValueError):
                 self.analyzer.analyze(str(python_file), 'unsupported')
+    
+    def test_decision_points_per_language(self):
+        """Test that each grammar's own branch nodes count towards complexity"""
+        sources = {
+            'python': (
+                'def f(a, b):\n'
+                '    if a and b:\n'
+                '        return 1\n'
+                '    elif a or b:\n'
+                '        return 2\n'
+                '    for x in a:\n'
+                '        pass\n'
+                '    return 3 if a else 4\n'
+            ),
+            'java': (
+                'class A {\n'
+                '    int f(int a, int b) {\n'
+                '        if (a > 0 && b > 0) { return 1; }\n'
+                '        switch (a) { case 1: return 2; case 2: return 3; }\n'
+                '        return a > b ? a : b;\n'
+                '    }\n'
+                '}\n'
+            ),
+            'javascript': (
+                'function f(a, b) {\n'
+                '    if (a || b) { return 1; }\n'
+                '    for (const x of a) {}\n'
+                '    try { g(); } catch (e) {}\n'
+                '    return a ? 2 : 3;\n'
+                '}\n'
+            ),
+        }
+        # Python: if, and, elif, or, for, conditional expression
+        # Java: if, &&, two case labels, ternary
+        # JavaScript: if, ||, for-of, catch, ternary
+        expected = {'python': 7, 'java': 6, 'javascript': 6}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for language, source in sources.items():
+                path = Path(temp_dir) / f'sample_{language}'
+                path.write_text(source)
+                result = self.analyzer.analyze(str(path), language)
+                functions = result['functions'] or result['classes'][0]['methods']
+                
+                self.assertEqual(functions[0]['complexity'], expected[language], language)
+
+class TestAnalysisCache(unittest.TestCase):
+    """Test the CodeAnalyzer's persistent cache and batch, shallow and incremental entry points"""
+    
+    SOURCE = (
+        'import os\n'
+        '\n'
+        'def outer(a):\n'
+        '    def inner(b):\n'
+        '        return b if b else 0\n'
+        '    if a:\n'
+        '        return inner(a)\n'
+        '    return 0\n'
+        '\n'
+        'class Box:\n'
+        '    def get(self, key):\n'
+        '        return key\n'
+    )
+    
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_path = Path(temp_dir.name)
+        self.analyzer = CodeAnalyzer(cache_path=str(self.temp_path / 'analysis.sqlite3'))
+        self.file_path = self.temp_path / 'sample.py'
+        self.file_path.write_text(self.SOURCE)
+    
+    def count_parses(self, analyzer, language='python'):
+        """Wrap a language's parser so its parse calls are counted"""
+        parser = mock.Mock(wraps=analyzer.parsers[language])
+        analyzer.parsers[language] = parser
+        return parser.parse
+    
+    def fresh_analysis(self, file_path, language='python'):
+        """Analyze with an analyzer that has its own empty cache"""
+        analyzer = CodeAnalyzer(cache_path=str(self.temp_path / 'fresh' / f'{os.urandom(4).hex()}.sqlite3'))
+        return analyzer.analyze(str(file_path), language)
+    
+    def test_unchanged_file_hits_cache(self):
+        """Test that re-analyzing unchanged content does not parse again"""
+        first = self.analyzer.analyze(str(self.file_path), 'python')
+        parse = self.count_parses(self.analyzer)
+        second = self.analyzer.analyze(str(self.file_path), 'python')
+        
+        self.assertEqual(parse.call_count, 0)
+        self.assertEqual(second, first)
+        self.assertEqual(second['source_code'], self.SOURCE)
+    
+    def test_cache_survives_new_analyzer(self):
+        """Test that the cache is shared by analyzers using the same database"""
+        self.analyzer.analyze(str(self.file_path), 'python')
+        analyzer = CodeAnalyzer(cache_path=str(self.analyzer.cache_path))
+        parse = self.count_parses(analyzer)
+        analyzer.analyze(str(self.file_path), 'python')
+        
+        self.assertEqual(parse.call_count, 0)
+    
+    def test_edited_file_misses_cache(self):
+        """Test that an edit is analyzed instead of served from the cache"""
+        self.analyzer.analyze(str(self.file_path), 'python')
+        self.file_path.write_text(self.SOURCE + '\ndef added():\n    pass\n')
+        parse = self.count_parses(self.analyzer)
+        result = self.analyzer.analyze(str(self.file_path), 'python')
+        
+        self.assertEqual(parse.call_count, 1)
+        self.assertIn('added', [func['name'] for func in result['functions']])
+    
+    def test_invalidate_drops_cached_analysis(self):
+        """Test that invalidate forces the next analysis to parse"""
+        self.analyzer.analyze(str(self.file_path), 'python')
+        self.analyzer.invalidate(str(self.file_path))
+        parse = self.count_parses(self.analyzer)
+        self.analyzer.analyze(str(self.file_path), 'python')
+        
+        self.assertEqual(parse.call_count, 1)
+    
+    def test_cache_version_bump_misses_cache(self):
+        """Test that entries written under another cache version are not reused"""
+        self.analyzer.analyze(str(self.file_path), 'python')
+        parse = self.count_parses(self.analyzer)
+        with mock.patch('parsers.code_analyzer._CACHE_VERSION', b'test'):
+            self.analyzer.analyze(str(self.file_path), 'python')
+        
+        self.assertEqual(parse.call_count, 1)
+    
+    def test_analyze_many_matches_analyze(self):
+        """Test that batch analysis gives the same results as analyzing each file"""
+        paths = [self.file_path, self.temp_path / 'empty.py', self.temp_path / 'crlf.py']
+        paths[1].write_text('')
+        paths[2].write_bytes(self.SOURCE.replace('\n', '\r\n').encode())
+        
+        results = self.analyzer.analyze_many([str(path) for path in paths], 'python')
+        
+        for path in paths:
+            self.assertEqual(results[str(path)], self.fresh_analysis(path))
+        self.assertEqual(results[str(paths[2])]['source_code'], self.SOURCE)
+    
+    def test_analyze_many_parallel_matches_analyze(self):
+        """Test that process-parallel analysis gives the same results as analyze"""
+        js_path = Path(__file__).parent.parent / 'examples' / 'arrayUtils.js'
+        paths_by_lang = {'python': [str(self.file_path)], 'javascript': [str(js_path)]}
+        
+        results = self.analyzer.analyze_many_parallel(paths_by_lang, workers=2)
+        
+        self.assertEqual(results[str(self.file_path)], self.fresh_analysis(self.file_path))
+        self.assertEqual(results[str(js_path)], self.fresh_analysis(js_path, 'javascript'))
+    
+    def test_shallow_analysis_keeps_top_level_definitions(self):
+        """Test that files over the threshold only get their top-level definitions"""
+        result = self.analyzer.analyze(str(self.file_path), 'python', shallow_threshold=0)
+        
+        self.assertEqual([func['name'] for func in result['functions']], ['outer'])
+        self.assertEqual([cls['name'] for cls in result['classes']], ['Box'])
+        self.assertEqual(len(result['imports']), 1)
+        self.assertEqual(result['functions'][0]['complexity'], 1)
+    
+    def test_shallow_result_not_served_to_full_analysis(self):
+        """Test that the threshold is part of the cache key"""
+        self.analyzer.analyze(str(self.file_path), 'python', shallow_threshold=0)
+        result = self.analyzer.analyze(str(self.file_path), 'python')
+        
+        self.assertEqual([func['name'] for func in result['functions']], ['outer', 'inner', 'get'])
+    
+    def test_incremental_analysis_matches_fresh_parse(self):
+        """Test that re-parsing an edited tree gives the same results as a fresh parse"""
+        edits = [
+            # Insert
+            self.SOURCE.replace('    if a:\n', '    while a:\n        a -= 1\n    if a:\n'),
+            # Delete
+            self.SOURCE.replace('    def inner(b):\n        return b if b else 0\n', ''),
+            # Replace
+            self.SOURCE.replace('return key', 'return key and self'),
+            # Edit at both ends of the file
+            '# header\n' + self.SOURCE + 'def tail():\n    pass\n',
+        ]
+        self.analyzer.analyze_incremental(str(self.file_path), 'python')
+        
+        for source in edits:
+            self.file_path.write_text(source)
+            result = self.analyzer.analyze_incremental(str(self.file_path), 'python')
+            
+            self.assertEqual(result, self.fresh_analysis(self.file_path))
+            tree, _ = self.analyzer._trees[(os.path.abspath(self.file_path), 'python')]
+            self.assertEqual(str(tree.root_node), str(self.analyzer.parsers['python'].parse(source.encode()).root_node))
 
 class TestTestGenerator(unittest.TestCase):
     """Test the TestGenerator class"""
     
     def setUp(self):
         self.generator = TestGenerator()
-        self.analyzer = CodeAnalyzer()
+        self.analyzer = _ANALYZER
         self.test_files_dir = Path(__file__).parent.parent / 'examples'
     
     def test_generate_python_tests(self):
@@ -125,6 +335,40 @@ class TestTestGenerator(unittest.TestCase):
         self.assertEqual(result['language'], 'python')
         self.assertIn('generated_tests', result)
 
+    def test_rename_whole_identifiers(self):
+        """Test that renaming a shared test only touches the target's identifier"""
+        code = 'from calc import add, add_numbers\ndef test_add():\n    assert add(1, 2) == obj.add(1, 2)\ndef test_add_helper(): pass\n'
+        
+        self.assertEqual(
+            _rename(code, 'add', 'sub'),
+            'from calc import sub, add_numbers\ndef test_sub():\n    assert sub(1, 2) == obj.add(1, 2)\ndef test_add_helper(): pass\n'
+        )
+    
+    def test_llm_cache_key_keeps_source_whitespace(self):
+        """Test that only template whitespace is ignored by the LLM cache key"""
+        prompt = 'Generate tests.\n\n```python\ndef f():\n    return "a  "\n\n```\n- Name: f\n'
+        key = self.generator._llm_cache_key('model', prompt)
+        
+        self.assertEqual(key, self.generator._llm_cache_key('model', prompt.replace('tests.\n\n', 'tests.  \n')))
+        self.assertNotEqual(key, self.generator._llm_cache_key('model', prompt.replace('"a  "', '"a"')))
+        self.assertNotEqual(key, self.generator._llm_cache_key('model', prompt.replace('\n\n```\n', '\n```\n')))
+
+    def test_generate_batch_malformed_response(self):
+        """Test that malformed batch responses map to None and are not cached"""
+        funcs = [{'name': 'add'}, {'name': 'sub'}]
+        
+        def generate_batch(prompt, response):
+            with mock.patch.object(self.generator, '_create_function_batch_prompt', return_value=prompt), \
+                    mock.patch.object(self.generator, '_request_openai_batch', return_value=response):
+                return self.generator._generate_batch(funcs, {}, 'pytest')
+        
+        codes = generate_batch('batch-list', '{"tests": ["def test_add(): pass"]}')
+        self.assertEqual(codes, [None, None])
+        self.assertIsNone(self.generator._llm_cache_load(self.generator._llm_cache_key('gpt-4o-mini', 'batch-list')))
+        
+        codes = generate_batch('batch-values', '{"tests": {"1": 5, "2": "def test_sub(): pass"}}')
+        self.assertEqual(codes, [None, 'def test_sub(): pass'])
+
 class TestProjectConfig(unittest.TestCase):
     """Test the ProjectConfig class"""
     
@@ -147,12 +391,107 @@ class TestProjectConfig(unittest.TestCase):
             self.assertIn('source_directories', result)
             self.assertIn('test_directories', result)
     
+    def test_configure_many(self):
+        """Test configuring several projects in one call"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            (temp_path / 'api').mkdir()
+            (temp_path / 'api' / 'requirements.txt').write_text('flask\n')
+            (temp_path / 'web').mkdir()
+            (temp_path / 'web' / 'package.json').write_text('{"devDependencies": {"mocha": "1"}}')
+
+            results = self.config.configure_many([
+                {'project_path': str(temp_path / 'api'), 'language': 'python'},
+                {'project_path': str(temp_path / 'web'), 'language': 'javascript'}
+            ])
+
+            self.assertEqual([r['language'] for r in results], ['python', 'javascript'])
+            self.assertEqual(results[1]['test_framework'], 'mocha')
+
+    def test_detect_python_dependencies(self):
+        """Test stripping version specifiers, extras and markers from requirements"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            (temp_path / 'requirements.txt').write_text(
+                '# comment\npytest==7.0.0\nrequests>=2\nmcp[cli]>=1.9\n'
+                'numpy~=2.2\nflask!=3.0\nclick\ncolorama; sys_platform == "win32"\n'
+            )
+
+            dependencies = self.config._detect_dependencies(temp_path, 'python')
+
+            self.assertEqual(dependencies, ['pytest', 'requests', 'mcp', 'numpy',
+                                            'flask', 'click', 'colorama'])
+
+    def test_detect_java_test_directories_deduplicated(self):
+        """Test that each Java test directory is listed once, in discovery order"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            for package in ('a', 'b'):
+                (temp_path / package).mkdir()
+                for name in ('FooTest.java', 'BarTest.java'):
+                    (temp_path / package / name).write_text('class X {}\n')
+
+            test_dirs = self.config._detect_test_directories(temp_path, 'java')
+
+            self.assertEqual(sorted(test_dirs), ['a', 'b'])
+
+    @unittest.skipIf(os.name == 'nt', 'symlinks need extra privileges on Windows')
+    def test_walk_files_skips_symlinks(self):
+        """Test that detection walks don't follow symlinked directories"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            (temp_path / 'pkg').mkdir()
+            (temp_path / 'pkg' / 'module.py').write_text('x = 1\n')
+            os.symlink(temp_path, temp_path / 'pkg' / 'loop')
+            os.symlink(temp_path / 'pkg' / 'module.py', temp_path / 'alias.py')
+
+            names = [entry.name for entry in self.config._walk_files(temp_path)]
+
+            self.assertEqual(names, ['module.py'])
+
     def test_load_nonexistent_config(self):
         """Test loading non-existent configuration"""
         with tempfile.TemporaryDirectory() as temp_dir:
             result = self.config.load_config(temp_dir)
             self.assertIsNone(result)
 
+    def test_load_config_cached_until_modified(self):
+        """Test that load_config reuses the parsed config until the file changes"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            (temp_path / 'requirements.txt').write_text('pytest==7.0.0\n')
+            self.config.configure(str(temp_path), 'python')
+
+            first = self.config.load_config(temp_dir)
+            first['language'] = 'mutated'
+            with mock.patch('json.load', side_effect=AssertionError('config re-read')):
+                self.assertEqual(self.config.load_config(temp_dir)['language'], 'python')
+
+            config_file = temp_path / self.config.config_file_name
+            config_file.write_text(json.dumps({'language': 'java'}))
+            os.utime(config_file, ns=(0, 0))
+            self.assertEqual(self.config.load_config(temp_dir), {'language': 'java'})
+
+    def test_configure_cached_until_marker_changes(self):
+        """Test that configure skips detection for unchanged projects"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            (temp_path / 'requirements.txt').write_text('pytest==7.0.0\n')
+
+            first = self.config.configure(str(temp_path), 'python')
+            framework = first['test_framework']
+            first['test_framework'] = 'mutated'
+            with mock.patch.object(self.config, '_auto_detect_config',
+                                   side_effect=AssertionError('detection re-run')):
+                cached = self.config.configure(str(temp_path), 'python')
+            self.assertEqual(cached['test_framework'], framework)
+
+            requirements = temp_path / 'requirements.txt'
+            requirements.write_text('pytest==7.0.0\nrequests==2.0\n')
+            os.utime(requirements, ns=(0, 0))
+            result = self.config.configure(str(temp_path), 'python')
+            self.assertIn('requests', result['dependencies'])
+
 class TestTestBuilder(unittest.TestCase):
     """Test the TestBuilder class"""
     
@@ -196,6 +535,47 @@ class TestTestBuilder(unittest.TestCase):
             finally:
                 os.unlink(f.name)
 
+class TestMCPServer(unittest.TestCase):
+    """Test the MCPServer protocol handler"""
+    
+    def setUp(self):
+        self.server = MCPServer()
+    
+    def test_tools_list(self):
+        """Test listing the registered tools"""
+        response = self.server.handle_request({'jsonrpc': '2.0', 'method': 'tools/list', 'id': '1'})
+        
+        tool_names = [tool['name'] for tool in response['result']['tools']]
+        self.assertEqual(tool_names, ['analyze_code', 'generate_tests',
+                                      'build_and_validate', 'configure_project'])
+        self.assertEqual(response['id'], '1')
+    
+    def test_tools_list_response_json(self):
+        """Test that the pre-serialized tools/list matches the dict response"""
+        request = {'method': 'tools/list', 'id': '1'}
+        
+        self.assertEqual(json.loads(self.server.tools_list_response_json('1')),
+                         self.server.handle_request(request))
+    
+    def test_unknown_method(self):
+        """Test calling a method that does not exist"""
+        response = self.server.handle_request({'method': 'unknown', 'id': '2'})
+        
+        self.assertEqual(response['error']['code'], -32601)
+        self.assertEqual(response['id'], '2')
+    
+    def test_invalid_request(self):
+        """Test a request without a method"""
+        response = self.server.handle_request({'id': '3'})
+        
+        self.assertEqual(response['error']['code'], -32603)
+    
+    def test_tools_call_missing_params(self):
+        """Test calling a tool without parameters"""
+        response = self.server.handle_request({'method': 'tools/call', 'id': '4'})
+        
+        self.assertEqual(response['error'], {'code': -32602, 'message': 'Missing parameters'})
+
 if __name__ == '__main__':
     unittest.main()
 
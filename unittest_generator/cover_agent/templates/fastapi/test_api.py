@@ -1,22 +1,25 @@
 import pytest
 from fastapi.testclient import TestClient
+from main import app  # Adjust import based on your app structure
 
-client = TestClient(app)
+@pytest.fixture(scope="module")
+def client():
+    """One test client (and app startup) shared by every test in this module"""
+    with TestClient(app) as c:
+        yield c
 
-def test_get_endpoints():
+@pytest.mark.parametrize("endpoint", ["/", "/health", "/docs"])
+def test_get_endpoints(client, endpoint):
     """Test GET endpoints return valid responses"""
-    endpoints = ["/", "/health", "/docs"]
-    
-    for endpoint in endpoints:
-        response = client.get(endpoint)
-        assert response.status_code in [200, 404, 405]
+    response = client.get(endpoint)
+    assert response.status_code in [200, 404, 405]
 
-def test_post_endpoints():
+def test_post_endpoints(client):
     """Test POST endpoints with sample data"""
     # TODO: Add your POST endpoints and test data
     pass
 
-def test_api_error_handling():
+def test_api_error_handling(client):
     """Test API error responses"""
     response = client.get("/nonexistent-endpoint")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
@@ -2,14 +2,18 @@ import pytest
 from fastapi.testclient import TestClient
 from main import app  # Adjust import based on your app structure
 
-client = TestClient(app)
+@pytest.fixture(scope="module")
+def client():
+    """One test client (and app startup) shared by every test in this module"""
+    with TestClient(app) as c:
+        yield c
 
-def test_root_endpoint():
+def test_root_endpoint(client):
     """Test the root endpoint"""
     response = client.get("/")
     assert response.status_code == 200
 
-def test_health_check():
+def test_health_check(client):
     """Test health check endpoint"""
     response = client.get("/health")
     assert response.status_code in [200, 404]  # 404 if not implemented
@@ -17,4 +21,4 @@ def test_health_check():
 def test_app_metadata():
     """Test app basic metadata"""
     assert app.title is not None
-    assert app.version is not None
\ No newline at end of file
+    assert app.version is not None
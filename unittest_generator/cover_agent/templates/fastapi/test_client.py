@@ -2,13 +2,17 @@ import pytest
 from fastapi.testclient import TestClient
 from main import app  # Adjust import based on your app structure
 
-client = TestClient(app)
+@pytest.fixture(scope="module")
+def client():
+    """One test client (and app startup) shared by every test in this module"""
+    with TestClient(app) as c:
+        yield c
 
-def test_client_initialization():
+def test_client_initialization(client):
     """Test that the test client can be created successfully"""
     assert client is not None
 
-def test_app_startup():
+def test_app_startup(client):
     """Test that the FastAPI app starts up correctly"""
     response = client.get("/docs")
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
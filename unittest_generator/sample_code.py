@@ -1,18 +1,23 @@
+import math
+
+# Exact types accepted by the arithmetic helpers; bool and other subclasses are rejected
+NUMBER_TYPES = frozenset({int, float})
+
 def add_numbers(a, b):
     """Add two numbers and return the result."""
-    if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+    if type(a) not in NUMBER_TYPES or type(b) not in NUMBER_TYPES:
         raise TypeError("Both arguments must be numbers")
     return a + b
 
 def multiply_numbers(a, b):
     """Multiply two numbers and return the result."""
-    if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+    if type(a) not in NUMBER_TYPES or type(b) not in NUMBER_TYPES:
         raise TypeError("Both arguments must be numbers")
     return a * b
 
 def divide_numbers(a, b):
     """Divide two numbers and return the result."""
-    if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+    if type(a) not in NUMBER_TYPES or type(b) not in NUMBER_TYPES:
         raise TypeError("Both arguments must be numbers")
     if b == 0:
         raise ValueError("Cannot divide by zero")
@@ -26,34 +31,33 @@ class Calculator:
     
     def add(self, a, b):
         result = add_numbers(a, b)
-        self.history.append(f"{a} + {b} = {result}")
+        self.history.append(("+", a, b, result))
         return result
     
     def multiply(self, a, b):
         result = multiply_numbers(a, b)
-        self.history.append(f"{a} * {b} = {result}")
+        self.history.append(("*", a, b, result))
         return result
     
     def divide(self, a, b):
         result = divide_numbers(a, b)
-        self.history.append(f"{a} / {b} = {result}")
+        self.history.append(("/", a, b, result))
         return result
     
     def get_history(self):
-        return self.history.copy()
+        # Entries are stored raw and only formatted when the history is read
+        return tuple(f"{a} {op} {b} = {result}" for op, a, b, result in self.history)
     
     def clear_history(self):
         self.history.clear()
 
 def factorial(n):
     """Calculate factorial of a number."""
-    if not isinstance(n, int):
+    if not isinstance(n, int) or isinstance(n, bool):
         raise TypeError("Input must be an integer")
     if n < 0:
         raise ValueError("Factorial is not defined for negative numbers")
-    if n == 0 or n == 1:
-        return 1
-    return n * factorial(n - 1)
+    return math.factorial(n)
 
 if __name__ == "__main__":
     # Example usage
@@ -1,5 +1,7 @@
 import os
 
+from sqlalchemy.pool import StaticPool
+
 BASEDIR = os.path.abspath(os.path.dirname(__file__))
 
 
@@ -25,7 +27,13 @@ class DevelopmentConfig(Config):
 
 class TestingConfig(Config):
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = create_sqlite_uri("todolist-test.db")
+    # In-memory database on a single shared connection, so it lives as long as
+    # the app and tests never touch the disk
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "poolclass": StaticPool,
+        "connect_args": {"check_same_thread": False},
+    }
     WTF_CSRF_ENABLED = False
     import logging
 
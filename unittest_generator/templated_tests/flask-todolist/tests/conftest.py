@@ -0,0 +1,57 @@
+import pytest
+import sqlalchemy as sa
+from flask_sqlalchemy.session import Session
+
+
+class ConnectionSession(Session):
+    # Flask-SQLAlchemy resolves the engine per table and would skip the
+    # connection holding the test's outer transaction
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        return bind if bind is not None else self.bind
+
+
+@pytest.fixture(scope="session")
+def app():
+    # The app package is imported here rather than at module level so that
+    # collecting the tests does not load it
+    from app import create_app, db
+
+    app = create_app("testing")
+    with app.app_context():
+        # pysqlite emits BEGIN lazily and commits on RELEASE of the outermost
+        # SAVEPOINT, so let SQLAlchemy own the transaction boundaries
+        @sa.event.listens_for(db.engine, "connect")
+        def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @sa.event.listens_for(db.engine, "begin")
+        def _begin(connection):
+            connection.exec_driver_sql("BEGIN")
+
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def db_session(app):
+    from app import db
+
+    # Every commit inside the test only releases a SAVEPOINT; the outer
+    # transaction is rolled back afterwards, so the schema is built once
+    connection = db.engine.connect()
+    transaction = connection.begin()
+    app_session = db.session
+    db.session = db._make_scoped_session(
+        {
+            "class_": ConnectionSession,
+            "bind": connection,
+            "join_transaction_mode": "create_savepoint",
+        }
+    )
+    yield db.session
+    db.session.remove()
+    db.session = app_session
+    transaction.rollback()
+    connection.close()
@@ -2,20 +2,8 @@ import json
 import pytest
 from flask import url_for
 
-from app import create_app, db
-from app.models import User, TodoList, Todo
-
-@pytest.fixture
-def app():
-    app = create_app("testing")
-    with app.app_context():
-        db.create_all()
-        yield app
-        db.session.remove()
-        db.drop_all()
-
 @pytest.fixture
-def client(app):
+def client(app, db_session):
     return app.test_client()
 
 @pytest.fixture
@@ -1,19 +1,10 @@
 import pytest
 from flask import current_app
-from app import create_app, db
+from app import db
 from app.models import User, TodoList, Todo
 
 @pytest.fixture
-def app():
-    app = create_app("testing")
-    with app.app_context():
-        db.create_all()
-        yield app
-        db.session.remove()
-        db.drop_all()
-
-@pytest.fixture
-def client(app):
+def client(app, db_session):
     return app.test_client()
 
 def test_app_exists(app):
@@ -41,7 +32,7 @@ def test_password_salts_are_random():
     u2 = User(password="correcthorsebatterystaple")
     assert u1.password_hash != u2.password_hash
 
-def test_adding_new_user(app):
+def test_adding_new_user(db_session):
     user = User(username="adam", email="adam@example.com", password="correcthorsebatterystaple")
     db.session.add(user)
     db.session.commit()
@@ -49,7 +40,7 @@ def test_adding_new_user(app):
     assert found is not None
     assert found.email == "adam@example.com"
 
-def test_adding_new_todo_without_user(app):
+def test_adding_new_todo_without_user(db_session):
     todolist = TodoList(title="shopping list")
     db.session.add(todolist)
     db.session.commit()
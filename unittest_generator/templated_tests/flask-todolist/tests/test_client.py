@@ -1,213 +1,130 @@
 import pytest
 from flask import url_for
-from app import create_app, db
-from app.models import User, TodoList, Todo
 
-@pytest.fixture
-def client():
-    app = create_app("testing")
-    app.config["WTF_CSRF_ENABLED"] = False  # Disable CSRF for testing
+# Page fragments the tests look for in response bodies
+HOME_TITLE = b"Todolist"
+HOME_TAGLINE = b"Dead simple Todolists."
+REGISTER_TEXT = b"Register"
+LOGIN_TEXT = b"Login"
+LOGOUT_TEXT = b"logout"
+OVERVIEW_TEXT = b"Overview"
+LOGIN_ERROR = b"Unable to login"
+REGISTRATION_ERROR = b"Your registration contains errors."
+NOT_FOUND_TEXT = b"Not Found"
 
-    with app.test_client() as client:
-        with app.app_context():
-            db.create_all()
-        yield client
-        with app.app_context():
-            db.session.remove()
-            db.drop_all()
+@pytest.fixture
+def client(app, db_session):
+    return app.test_client()
+
+@pytest.fixture(scope="session")
+def urls(app):
+    # Routes are the same for every app instance, so resolve them once
+    with app.test_request_context():
+        return {
+            "index": url_for("main.index"),
+            "register": url_for("auth.register"),
+            "login": url_for("auth.login"),
+        }
 
-def test_home_page(client):
-    with client.application.test_request_context():
-        url = url_for("main.index")
-    response = client.get(url)
+@pytest.fixture
+def existing_user(db_session):
+    # Inserted directly; going through the register form would cost a full
+    # request, template render and redirect
+    from app.models import User
+
+    user_data = {"username": "dupe", "email": "dupe1@example.com", "password": "testpass"}
+    db_session.add(User(**user_data))
+    db_session.commit()
+    return user_data
+
+def test_home_page(client, urls):
+    response = client.get(urls["index"])
     assert response.status_code == 200
-    assert b"Todolist" in response.data or b"Dead simple Todolists." in response.data
+    # Every .data access re-joins the response body, so read it once
+    body = response.get_data()
+    assert HOME_TITLE in body or HOME_TAGLINE in body
 
-def test_register_page(client):
-    with client.application.test_request_context():
-        url = url_for("auth.register")
-    response = client.get(url)
+def test_register_page(client, urls):
+    response = client.get(urls["register"])
     assert response.status_code == 200
-    assert b"Register" in response.data
+    assert REGISTER_TEXT in response.get_data()
 
-def test_login_page(client):
-    with client.application.test_request_context():
-        url = url_for("auth.login")
-    response = client.get(url)
+def test_login_page(client, urls):
+    response = client.get(urls["login"])
     assert response.status_code == 200
-    assert b"Login" in response.data
+    assert LOGIN_TEXT in response.get_data()
 
-def test_register_and_login(client):
+def test_register_and_login(client, urls):
     username = "bob"
     email = "bob@example.com"
     password = "secret123"
 
-    with client.application.test_request_context():
-        register_url = url_for("auth.register")
-        login_url = url_for("auth.login")
-
     # Register
     response = client.post(
-        register_url,
+        urls["register"],
         data={
             "username": username,
             "email": email,
             "password": password,
             "password_confirmation": password,
         },
-        follow_redirects=True,
     )
-    assert response.status_code == 200
-    assert b"Login" in response.data
+    # A successful registration redirects to the login page
+    assert response.status_code == 302
+    assert response.headers["Location"] == urls["login"]
 
     # Login
-    @pytest.fixture
-    def client():
-        app = create_app("testing")
-        app.config["WTF_CSRF_ENABLED"] = False  # Disable CSRF for testing
-
-        with app.test_client() as client:
-            with app.app_context():
-                db.create_all()
-            yield client
-            with app.app_context():
-                db.session.remove()
-                db.drop_all()
-
-    def test_home_page(client):
-        with client.application.test_request_context():
-            url = url_for("main.index")
-        response = client.get(url)
-        assert response.status_code == 200
-        assert b"Todolist" in response.data or b"Dead simple Todolists." in response.data
-
-    def test_register_page(client):
-        with client.application.test_request_context():
-            url = url_for("auth.register")
-        response = client.get(url)
-        assert response.status_code == 200
-        assert b"Register" in response.data
-
-    def test_login_page(client):
-        with client.application.test_request_context():
-            url = url_for("auth.login")
-        response = client.get(url)
-        assert response.status_code == 200
-        assert b"Login" in response.data
-
-    def test_register_and_login(client):
-        username = "bob"
-        email = "bob@example.com"
-        password = "secret123"
-
-        with client.application.test_request_context():
-            register_url = url_for("auth.register")
-            login_url = url_for("auth.login")
-
-        # Register
-        response = client.post(
-            register_url,
-            data={
-                "username": username,
-                "email": email,
-                "password": password,
-                "password_confirmation": password,
-            },
-            follow_redirects=True,
-        )
-        assert response.status_code == 200
-        assert b"Login" in response.data
-
-        # Login
-        response = client.post(
-            login_url,
-            data={
-                "email_or_username": email,
-                "password": password,
-            },
-            follow_redirects=True,
-        )
-        assert response.status_code == 200
-        assert b"logout" in response.data or b"Overview" in response.data
-
-
-    def test_invalid_login(client):
-        with client.application.test_request_context():
-            login_url = url_for("auth.login")
-        response = client.post(
-            login_url,
-            data={
-                "email_or_username": "notexist@example.com",
-                "password": "wrongpass",
-            },
-            follow_redirects=True,
-        )
-        assert b"Unable to login" in response.data or b"Login" in response.data
-
-    def test_register_duplicate_username(client):
-        username = "dupe"
-        email1 = "dupe1@example.com"
-        email2 = "dupe2@example.com"
-        password = "testpass"
-        with client.application.test_request_context():
-            register_url = url_for("auth.register")
+    response = client.post(
+        urls["login"],
+        data={
+            "email_or_username": email,
+            "password": password,
+        },
+    )
+    assert response.status_code == 302
+    # Land on the redirect target to check the session is logged in
+    response = client.get(response.headers["Location"])
+    assert response.status_code == 200
+    body = response.get_data()
+    assert LOGOUT_TEXT in body or OVERVIEW_TEXT in body
 
-        # First registration
-        client.post(
-            register_url,
-            data={
-                "username": username,
-                "email": email1,
-                "password": password,
-                "password_confirmation": password,
-            },
-            follow_redirects=True,
-        )
-        # Second registration with same username
-        response = client.post(
-            register_url,
-            data={
-                "username": username,
-                "email": email2,
-                "password": password,
-                "password_confirmation": password,
-            },
-            follow_redirects=True,
-        )
-        assert b"Username already in use" in response.data
+def test_invalid_login(client, urls):
+    response = client.post(
+        urls["login"],
+        data={
+            "email_or_username": "notexist@example.com",
+            "password": "wrongpass",
+        },
+    )
+    body = response.get_data()
+    assert LOGIN_ERROR in body or LOGIN_TEXT in body
 
-    def test_register_duplicate_email(client):
-        username1 = "user1"
-        username2 = "user2"
-        email = "dupe@example.com"
-        password = "testpass"
-        with client.application.test_request_context():
-            register_url = url_for("auth.register")
+def test_register_duplicate_username(client, urls, existing_user):
+    response = client.post(
+        urls["register"],
+        data={
+            "username": existing_user["username"],
+            "email": "dupe2@example.com",
+            "password": "testpass",
+            "password_confirmation": "testpass",
+        },
+    )
+    # The form only reports that the registration has errors, not which ones
+    assert REGISTRATION_ERROR in response.get_data()
 
-        # First registration
-        client.post(
-            register_url,
-            data={
-                "username": username1,
-                "email": email,
-                "password": password,
-                "password_confirmation": password,
-            },
-            follow_redirects=True,
-        )
-        # Second registration with same email
-        response = client.post(
-            register_url,
-            data={
-                "username": username2,
-                "email": email,
-                "password": password,
-                "password_confirmation": password,
-            },
-            follow_redirects=True,
-        )
-        assert b"Email already registered" in response.data
+def test_register_duplicate_email(client, urls, existing_user):
+    response = client.post(
+        urls["register"],
+        data={
+            "username": "user2",
+            "email": existing_user["email"],
+            "password": "testpass",
+            "password_confirmation": "testpass",
+        },
+    )
+    # The form only reports that the registration has errors, not which ones
+    assert REGISTRATION_ERROR in response.get_data()
 
-    def test_404_page(client):
-        response = client.get("/not-a-real-page", follow_redirects=True)
-        assert response.status_code == 404 or b"Not Found" in response.data
\ No newline at end of file
+def test_404_page(client):
+    response = client.get("/not-a-real-page")
+    assert response.status_code == 404 or NOT_FOUND_TEXT in response.get_data()
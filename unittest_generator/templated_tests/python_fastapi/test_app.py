@@ -2,7 +2,8 @@ import pytest
 from fastapi.testclient import TestClient  
 from app import app  
   
-@pytest.fixture  
+# Endpoints are stateless, so one client and lifespan serve the whole session
+@pytest.fixture(scope="session")
 def client():  
     with TestClient(app) as c:  
         yield c  
@@ -13,61 +14,27 @@ def test_placeholder():
     """Placeholder test to establish file structure"""  
     pass
 
-def test_echo_endpoint(client):
-    response = client.get("/echo/Hello")
-    assert response.status_code == 200
-    assert response.json() == {"message": "Hello"}
-
-
-def test_is_palindrome(client):
-    response = client.get("/is-palindrome/racecar")
-    assert response.status_code == 200
-    assert response.json() == {"is_palindrome": True}
-
-
-def test_sqrt_negative(client):
-    response = client.get("/sqrt/-1")
-    assert response.status_code == 400
-    assert response.json() == {"detail": "Cannot take square root of a negative number"}
-
-
-def test_square_endpoint(client):
-    response = client.get("/square/4")
-    assert response.status_code == 200
-    assert response.json() == {"result": 16}
-
-
-def test_divide_by_zero(client):
-    response = client.get("/divide/10/0")
-    assert response.status_code == 400
-    assert response.json() == {"detail": "Cannot divide by zero"}
-
-
-def test_multiply_endpoint(client):
-    response = client.get("/multiply/3/7")
-    assert response.status_code == 200
-    assert response.json() == {"result": 21}
-
-
-def test_subtract_endpoint(client):
-    response = client.get("/subtract/10/4")
-    assert response.status_code == 200
-    assert response.json() == {"result": 6}
-
-
-def test_add_endpoint(client):
-    response = client.get("/add/3/5")
-    assert response.status_code == 200
-    assert response.json() == {"result": 8}
+@pytest.mark.parametrize(
+    "url, status_code, expected",
+    [
+        ("/", 200, {"message": "Welcome to the FastAPI application!"}),
+        ("/echo/Hello", 200, {"message": "Hello"}),
+        ("/is-palindrome/racecar", 200, {"is_palindrome": True}),
+        ("/sqrt/-1", 400, {"detail": "Cannot take square root of a negative number"}),
+        ("/square/4", 200, {"result": 16}),
+        ("/divide/10/0", 400, {"detail": "Cannot divide by zero"}),
+        ("/multiply/3/7", 200, {"result": 21}),
+        ("/subtract/10/4", 200, {"result": 6}),
+        ("/add/3/5", 200, {"result": 8}),
+    ],
+)
+def test_endpoints(client, url, status_code, expected):
+    response = client.get(url)
+    assert response.status_code == status_code
+    assert response.json() == expected
 
 
 def test_current_date(client):
     response = client.get("/current-date")
     assert response.status_code == 200
     assert response.json() == {"date": date.today().isoformat()}
-
-
-def test_root_endpoint(client):
-    response = client.get("/")
-    assert response.status_code == 200
-    assert response.json() == {"message": "Welcome to the FastAPI application!"}
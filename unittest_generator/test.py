@@ -1,14 +1,22 @@
 # import argparse
+# import functools
 # import os
 # import ast
 # import subprocess
 # import xml.etree.ElementTree as ET
 # import re
+# from concurrent.futures import ThreadPoolExecutor
 # from dotenv import load_dotenv
 # from groq import Groq 
 
 # load_dotenv()
 
+# THINK_BLOCK = re.compile(r'<think>.*?</think>', flags=re.DOTALL)
+# CODE_BLOCK_PATTERNS = [
+#     re.compile(r'```python\s*\n(.*?)\n```', flags=re.DOTALL),
+#     re.compile(r'```\s*\n(.*?)\n```', flags=re.DOTALL)
+# ]
+
 # def get_python_files(path):
 #     python_files = []
 #     if os.path.isfile(path):
@@ -21,10 +29,15 @@
 #                     python_files.append(os.path.join(root, file))
 #     return python_files
 
+# @functools.lru_cache(maxsize=128)
+# def parse_source(source):
+#     # Identical sources, such as a test regenerated unchanged on retry, are parsed once
+#     return ast.parse(source)
+
 # def analyze_dependencies(file_path):
 #     with open(file_path, 'r', encoding='utf-8') as f:
 #         content = f.read()
-#     tree = ast.parse(content)
+#     tree = parse_source(content)
 
 #     imports = []
 #     definitions = []
@@ -46,16 +59,11 @@
 #         return None
     
 #     # Remove <think> blocks first
-#     response = re.sub(r'<think>.*?</think>', '', response, flags=re.DOTALL)
+#     response = THINK_BLOCK.sub('', response)
     
 #     # Find code blocks with ```python or ```
-#     code_block_patterns = [
-#         r'```python\s*\n(.*?)\n```',
-#         r'```\s*\n(.*?)\n```'
-#     ]
-    
-#     for pattern in code_block_patterns:
-#         matches = re.findall(pattern, response, flags=re.DOTALL)
+#     for pattern in CODE_BLOCK_PATTERNS:
+#         matches = pattern.findall(response)
 #         if matches:
 #             # Take the first complete code block
 #             return matches[0].strip()
@@ -73,8 +81,13 @@
     
 #     return '\n'.join(cleaned_lines).strip()
 
+# @functools.lru_cache(maxsize=None)
+# def get_llm_client():
+#     # One client for the whole run so every call reuses its pooled HTTPS connections
+#     return Groq(api_key=os.getenv("GROQ_API_KEY"))
+
 # def call_llm(prompt, model="deepseek-r1-distill-llama-70b"):  
-#     client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+#     client = get_llm_client()
 #     try:
 #         response = client.chat.completions.create(
 #             model=model,
@@ -133,7 +146,7 @@
     
 #     # Validate syntax
 #     try:
-#         ast.parse(cleaned_code)
+#         parse_source(cleaned_code)
 #     except SyntaxError as e:
 #         print(f"Generated code has syntax error: {e}")
 #         print("Generated code:")
@@ -206,20 +219,22 @@
 
 #     # Generate tests
 #     project_root = os.path.abspath(args.project_root)
+
+#     # Sources do not change between attempts, so read and parse them once
+#     dependencies = {python_file: analyze_dependencies(python_file) for python_file in all_files}
+
+#     def generate(python_file):
+#         deps = dependencies[python_file]
+#         return generate_tests_for_file(python_file, deps['content'], deps)
     
 #     retries = 0
 #     while retries < args.max_retries:
 #         print(f"\nAttempt {retries + 1}...")
         
-#         test_files = []
-#         for python_file in all_files:
-#             deps = analyze_dependencies(python_file)
-#             with open(python_file, 'r', encoding='utf-8') as f:
-#                 content = f.read()
-            
-#             test_file = generate_tests_for_file(python_file, content, deps)
-#             if test_file:
-#                 test_files.append(test_file)
+#         # Each file mostly waits on its own LLM request, so run them concurrently;
+#         # map keeps the results in input order
+#         with ThreadPoolExecutor(max_workers=min(16, len(all_files))) as executor:
+#             test_files = [test_file for test_file in executor.map(generate, all_files) if test_file]
 
 #         if not test_files:
 #             print("No test files generated.")
@@ -1,3 +1,5 @@
+import math
+
 import pytest
 from sample_code import add_numbers, multiply_numbers, divide_numbers, Calculator, factorial
 
@@ -12,6 +14,8 @@ def test_add_numbers():
         add_numbers("5", 3)
     with pytest.raises(TypeError):
         add_numbers(5, "3")
+    with pytest.raises(TypeError):
+        add_numbers(True, 3)
 
 def test_multiply_numbers():
     # Test normal multiplication
@@ -52,10 +56,15 @@ def test_factorial():
         factorial(-1)
     with pytest.raises(TypeError):
         factorial("5")
+    with pytest.raises(TypeError):
+        factorial(True)
+
+    # Inputs beyond the default recursion limit
+    assert factorial(3000) == math.factorial(3000)
 
 def test_calculator_init():
     calc = Calculator()
-    assert calc.get_history() == []
+    assert calc.get_history() == ()
 
 def test_calculator_add():
     calc = Calculator()
@@ -119,8 +128,9 @@ def test_calculator_get_history():
     assert history[0] == "5 + 3 = 8"
     assert history[1] == "5 * 3 = 15"
     
-    # Modify the copied history and verify original remains unchanged
-    history[0] = "Modified"
+    # The returned history is read-only
+    with pytest.raises(TypeError):
+        history[0] = "Modified"
     assert calc.get_history()[0] == "5 + 3 = 8"
 
 def test_calculator_clear_history():